@@ -1,15 +1,21 @@
 import streamlit as st
+import time
+inicio_rerun = time.perf_counter()
 from datetime import date
-from io import BytesIO
-from docx import Document
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.shared import Pt
-from openai import OpenAI
-from pypdf import PdfReader
-from fpdf import FPDF
-import base64
+from pei.armazenamento import AutoSalvamento, obter_armazenamento
+from pei.ativos import ativos
+from pei.bncc import candidatas
+from pei.cliente import PROVEDOR
+from pei.dados import dados_vazios
+from pei.documento import gerar_docx, gerar_pdf
+from pei.exportacao import arquivo_zip, exportar, exportar_turma
+from pei.laudo import ler_laudo, resumo_extracao
+from pei.metricas import cronometrar, iniciar_servidor, registro
+from pei.tarefas import CONCLUIDA, ERRO, NA_FILA, descartar, enviar, situacao
+from functools import partial
+from pathlib import Path
 import os
-import re
+import uuid
 
 # --- 1. CONFIGURAÇÃO INICIAL ---
 def get_favicon():
@@ -23,38 +29,7 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- 2. UTILITÁRIOS ---
-def finding_logo():
-    possiveis = ["360.png", "360.jpg", "logo.png", "logo.jpg", "iconeaba.png"]
-    for nome in possiveis:
-        if os.path.exists(nome): return nome
-    return None
-
-def get_base64_image(image_path):
-    if not image_path: return ""
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode()
-
-def ler_pdf(arquivo):
-    if arquivo is None: return ""
-    try:
-        reader = PdfReader(arquivo)
-        texto = ""
-        for i, page in enumerate(reader.pages):
-            if i >= 6: break 
-            texto += page.extract_text() + "\n"
-        return texto
-    except Exception as e: return f"Erro ao ler PDF: {e}"
-
-def limpar_texto_pdf(texto):
-    if not texto: return ""
-    texto = texto.replace('**', '').replace('__', '')
-    texto = texto.replace('### ', '').replace('## ', '').replace('# ', '')
-    texto = texto.replace('* ', '• ')
-    texto = re.sub(r'[^\x00-\xff]', '', texto) 
-    return texto
-
-# --- 3. CSS (DESIGN SYSTEM FINAL) ---
+# --- 2. CSS (DESIGN SYSTEM FINAL) ---
 st.markdown("""
     <link href="https://cdn.jsdelivr.net/npm/remixicon@4.1.0/fonts/remixicon.css" rel="stylesheet">
     <link href="https://fonts.googleapis.com/css2?family=Nunito:wght@400;600;700;800&display=swap" rel="stylesheet">
@@ -136,202 +111,76 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# --- 4. INTELIGÊNCIA ARTIFICIAL (GPT-4o) ---
-def consultar_gpt(api_key, dados, contexto_pdf=""):
-    if not api_key: return None, "⚠️ Configure a Chave API OpenAI na barra lateral."
-    
-    try:
-        client = OpenAI(api_key=api_key)
-        contexto_seguro = contexto_pdf[:5000] if contexto_pdf else "Sem laudo anexado."
-        
-        is_ahsd = "altas habilidades" in dados['diagnostico'].lower() or "superdotação" in dados['diagnostico'].lower()
-        foco = "ENRIQUECIMENTO E APROFUNDAMENTO" if is_ahsd else "FLEXIBILIZAÇÃO E SUPORTE"
-
-        prompt_sistema = """
-        Você é um Neuropsicopedagogo Sênior.
-        Tarefa: Redigir o PEI (Plano de Ensino Individualizado).
-        Diretriz: Se houver PDF anexo, extraia o diagnóstico dele caso não informado manualmente. Considere a medicação no planejamento.
-        """
-
-        prompt_usuario = f"""
-        ESTUDANTE: {dados['nome']} | Série: {dados['serie']}
-        DIAGNÓSTICO: {dados['diagnostico']} ({foco})
-        MEDICAÇÃO: {dados['medicacao']}
-        
-        MAPA DE POTENCIALIDADES (Use isso para estratégias de engajamento):
-        - Hiperfoco: {dados['hiperfoco']}
-        - Pontos Fortes: {', '.join(dados['potencias'])}
-        
-        CONTEXTO: {dados['historico']} | {dados['familia']}
-        REDE DE APOIO: {', '.join(dados['rede_apoio'])} | {dados['orientacoes_especialistas']}
-        
-        BARREIRAS:
-        - Sensorial: {', '.join(dados['b_sensorial'])}
-        - Cognitivo: {', '.join(dados['b_cognitiva'])}
-        - Social: {', '.join(dados['b_social'])}
-        
-        ESTRATÉGIAS SELECIONADAS:
-        - Acesso: {', '.join(dados['estrategias_acesso'])}
-        - Ensino: {', '.join(dados['estrategias_ensino'])}
-        - Avaliação: {', '.join(dados['estrategias_avaliacao'])}
-        
-        LAUDO PDF: {contexto_seguro}
-        
-        GERE O RELATÓRIO:
-        1. PERFIL: Sintetize o diagnóstico, histórico e *potencialidades*.
-        2. BNCC: Adapte 1 Habilidade Essencial da {dados['serie']}.
-        3. ESTRATÉGIAS: Como aplicar o suporte e usar os pontos fortes.
-        4. CONCLUSÃO: Parecer final.
-        """
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "system", "content": prompt_sistema}, {"role": "user", "content": prompt_usuario}],
-            temperature=0.7
-        )
-        return response.choices[0].message.content, None
-    except Exception as e: return None, f"Erro OpenAI: {str(e)}."
-
-# --- 5. PDF REFINADO ---
-class PDF_V3(FPDF):
-    def header(self):
-        self.set_draw_color(0, 78, 146)
-        self.set_line_width(0.4)
-        self.rect(5, 5, 200, 287)
-        
-        logo = finding_logo()
-        if logo: 
-            self.image(logo, 12, 12, 22)
-            x_offset = 40
-        else: x_offset = 12
-        
-        self.set_xy(x_offset, 15)
-        self.set_font('Arial', 'B', 14)
-        self.set_text_color(0, 78, 146)
-        self.cell(0, 8, 'PLANO DE ENSINO INDIVIDUALIZADO', 0, 1, 'L')
-        
-        self.set_xy(x_offset, 22)
-        self.set_font('Arial', 'I', 9)
-        self.set_text_color(100)
-        self.cell(0, 5, 'Documento Oficial de Planejamento Pedagógico', 0, 1, 'L')
-        self.ln(15)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.set_text_color(128)
-        self.cell(0, 10, f'Gerado via PEI 360º | Página {self.page_no()}', 0, 0, 'C')
-
-    def section_title(self, label):
-        self.ln(5)
-        self.set_fill_color(240, 248, 255)
-        self.set_text_color(0, 78, 146)
-        self.set_font('Arial', 'B', 11)
-        self.cell(0, 8, f"  {label}", 0, 1, 'L', fill=True)
-        self.ln(3)
-
-def gerar_pdf(dados, tem_anexo):
-    pdf = PDF_V3()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=20)
-    
-    # 1. Identificação
-    pdf.section_title("1. IDENTIFICAÇÃO E CONTEXTO")
-    pdf.set_font("Arial", size=10); pdf.set_text_color(0)
-    
-    nasc = dados['nasc'].strftime('%d/%m/%Y') if dados['nasc'] else "-"
-    diag_display = dados['diagnostico'] if dados['diagnostico'] else ("Em análise (Vide laudo anexo)" if tem_anexo else "Não informado")
-    med_display = dados['medicacao'] if dados['medicacao'] else "Não faz uso / Não informado"
-
-    txt_ident = (
-        f"Nome: {dados['nome']}\n"
-        f"Nascimento: {nasc}\n"
-        f"Série: {dados['serie']} | Turma: {dados['turma']}\n"
-        f"Diagnóstico: {diag_display}\n"
-        f"Medicação: {med_display}"
-    )
-    pdf.multi_cell(0, 6, limpar_texto_pdf(txt_ident))
-    
-    # 2. Rede de Apoio
-    if dados['rede_apoio'] or dados['orientacoes_especialistas']:
-        pdf.ln(3)
-        pdf.set_font("Arial", 'B', 10)
-        pdf.cell(0, 6, "Suporte Multidisciplinar:", 0, 1)
-        pdf.set_font("Arial", size=10)
-        
-        prof = ', '.join(dados['rede_apoio']) if dados['rede_apoio'] else "-"
-        ori = dados['orientacoes_especialistas'] if dados['orientacoes_especialistas'] else "-"
-        pdf.multi_cell(0, 6, limpar_texto_pdf(f"Profissionais: {prof}.\nOrientações: {ori}"))
-
-    # 3. Relatório IA
-    if dados['ia_sugestao']:
-        pdf.ln(5)
-        txt_ia = limpar_texto_pdf(dados['ia_sugestao'])
-        pdf.multi_cell(0, 6, txt_ia)
-        
-    # 4. Assinaturas
-    pdf.ln(20)
-    y = pdf.get_y()
-    if y > 250: pdf.add_page(); y = 40
-    pdf.line(20, y, 90, y); pdf.line(120, y, 190, y)
-    pdf.set_font("Arial", 'I', 8)
-    pdf.text(35, y+5, "Coordenação / Direção"); pdf.text(135, y+5, "Família / Responsável")
-    
-    return pdf.output(dest='S').encode('latin-1', 'replace')
-
-def gerar_docx(dados):
-    doc = Document()
-    style = doc.styles['Normal']; style.font.name = 'Arial'; style.font.size = Pt(11)
-    
-    doc.add_heading('PLANO DE ENSINO INDIVIDUALIZADO', 0)
-    doc.add_paragraph(f"Estudante: {dados['nome']}")
-    doc.add_paragraph(f"Série: {dados['serie']} | Turma: {dados['turma']}")
-    doc.add_paragraph(f"Diagnóstico: {dados['diagnostico']}")
-    doc.add_paragraph(f"Medicação: {dados['medicacao']}")
-    
-    if dados['ia_sugestao']:
-        doc.add_heading('Parecer Pedagógico', level=1)
-        doc.add_paragraph(dados['ia_sugestao'])
-        
-    buffer = BytesIO(); doc.save(buffer); buffer.seek(0)
-    return buffer
-
-# --- 6. ESTADO ---
+# --- 3. ESTADO ---
+iniciar_servidor()
+logo_ativos = ativos()
 if 'dados' not in st.session_state:
-    st.session_state.dados = {
-        'nome': '', 'nasc': None, 'serie': None, 'turma': '', 
-        'diagnostico': '', 'medicacao': '', 
-        'historico': '', 'familia': '', 'hiperfoco': '', 'potencias': [],
-        'rede_apoio': [], 'orientacoes_especialistas': '',
-        'b_sensorial': [], 'sup_sensorial': '🟡 Monitorado',
-        'b_cognitiva': [], 'sup_cognitiva': '🟡 Monitorado',
-        'b_social': [], 'sup_social': '🟡 Monitorado',
-        'estrategias_acesso': [], 'estrategias_ensino': [], 'estrategias_avaliacao': [],
-        'ia_sugestao': ''
-    }
+    st.session_state.dados = dados_vazios()
 if 'pdf_text' not in st.session_state: st.session_state.pdf_text = ""
-
-# --- 7. SIDEBAR ---
+if 'sessao_id' not in st.session_state: st.session_state.sessao_id = uuid.uuid4().hex  # limite de gerações por sessão
+
+# Persistência: o autosave compara com o último estado gravado e grava só os campos alterados
+armazenamento = obter_armazenamento()
+if 'autosave' not in st.session_state:
+    st.session_state.autosave = AutoSalvamento(armazenamento)
+    st.session_state.versao_estudante = 0
+
+def autosalvar():
+    st.session_state.autosave.registrar(st.session_state.dados, st.session_state.pdf_text)
+
+def abrir_estudante(estudante_id):
+    st.session_state.autosave.descarregar()  # grava o que estiver pendente do estudante atual
+    # Geração em andamento é do estudante atual: o resultado não pode cair no que será aberto
+    tarefa_id = st.session_state.pop('tarefa_ia', None)
+    if tarefa_id: descartar(tarefa_id)
+    st.session_state.pop('aviso_ia', None)
+    dados, laudo = armazenamento.carregar(estudante_id) if estudante_id else (None, "")
+    st.session_state.dados = dados or dados_vazios()
+    st.session_state.pdf_text = laudo
+    st.session_state.autosave = AutoSalvamento(armazenamento, estudante_id if dados else None)
+    st.session_state.autosave.marcar_gravado(st.session_state.dados, laudo)
+    st.session_state.versao_estudante += 1
+    # Widgets com key guardam o valor antigo: limpa para que mostrem o estudante aberto
+    for chave in ("b1", "b2", "b3", "s1", "s2", "s3"): st.session_state.pop(chave, None)
+
+# --- 4. SIDEBAR ---
 with st.sidebar:
-    logo = finding_logo()
-    if logo: st.image(logo, width=120)
+    if logo_ativos["cabecalho"]: st.image(logo_ativos["cabecalho"], width=120)
     
-    if 'OPENAI_API_KEY' in st.secrets:
+    if PROVEDOR == "simulado":
+        api_key = "simulado"  # servidor local: qualquer chave serve
+        st.info("🧪 Provedor simulado (sem rede, sem custo)")
+    elif 'OPENAI_API_KEY' in st.secrets:
         api_key = st.secrets['OPENAI_API_KEY']
         st.success("✅ OpenAI Ativa")
     else:
         api_key = st.text_input("Chave OpenAI (sk-...):", type="password")
-        
+
+    st.markdown("##### 📂 Estudantes")
+    busca = st.text_input("Buscar por nome", placeholder="Digite o início do nome...")
+    encontrados = armazenamento.listar(busca)
+    escolhido = st.selectbox("PEIs salvos", encontrados, index=None, placeholder="Selecione...",
+                             format_func=lambda e: f"{e['nome']} — {e['serie'] or ''} {e['turma']}".strip(" —"))
+    c_abrir, c_novo = st.columns(2)
+    if c_abrir.button("📂 Abrir", disabled=escolhido is None):
+        abrir_estudante(escolhido['id']); st.rerun()
+    if c_novo.button("➕ Novo"):
+        abrir_estudante(None); st.rerun()
+    if st.session_state.autosave.estudante_id: st.caption(f"✔️ Salvo automaticamente: {st.session_state.dados['nome']}")
+
+    # Painel de desempenho: PEI_DEBUG=1 ou ?debug=1 na URL
+    if os.environ.get("PEI_DEBUG") or st.query_params.get("debug") == "1":
+        with st.expander("🔧 Desempenho"):
+            resumo = registro.resumo()
+            st.dataframe([{"etapa": k, **v} for k, v in resumo["etapas"].items()], hide_index=True)
+            st.json(resumo["contadores"])
     st.markdown("---")
     st.markdown("<div style='font-size:0.8rem; color:#A0AEC0;'>PEI 360º v3.5<br>Stable Release</div>", unsafe_allow_html=True)
 
-# --- 8. LAYOUT ---
+# --- 5. LAYOUT ---
 
 # CABEÇALHO (Card Branco Puro)
-logo_path = finding_logo()
-b64_logo = get_base64_image(logo_path)
-mime = "image/png" if logo_path and logo_path.endswith("png") else "image/jpeg"
-img_html = f'<img src="data:{mime};base64,{b64_logo}" style="height: 70px;">' if logo_path else ""
+img_html = f'<img src="data:{logo_ativos["cabecalho_mime"]};base64,{logo_ativos["cabecalho_b64"]}" style="height: 70px;">' if logo_ativos["logo"] else ""
 
 st.markdown(f"""
     <div class="unified-card header-content">
@@ -381,151 +230,282 @@ with tab0:
             <p>Garantia das Aprendizagens Essenciais através da flexibilização curricular.</p>
         </div>""", unsafe_allow_html=True)
 
+# Cada aba é um fragmento: interagir com ela reexecuta só a própria aba, não o app inteiro.
+# Os campos ficam em formulários e só são gravados em st.session_state.dados ao clicar em "Salvar".
+# Rerun só da aba não passa pelo fim do script (app.rerun): cada fragmento mede a si mesmo (app.fragmento.*).
+SERIES = ["Infantil", "1º Ano", "2º Ano", "3º Ano", "4º Ano", "5º Ano", "Fund. II", "Ensino Médio"]
+NIVEIS_SUPORTE = ["Autônomo", "Monitorado", "Substancial", "Muito Substancial"]
+
+def nivel_suporte(valor):
+    return valor if valor in NIVEIS_SUPORTE else "Monitorado"
+
+def botao_salvar():
+    return st.form_submit_button("💾 Salvar", type="primary")
+
 # TAB 1: ESTUDANTE
-with tab1:
+@st.fragment
+@cronometrar("app.fragmento.estudante")
+def aba_estudante():
+    d = st.session_state.dados
     st.markdown("### <i class='ri-user-smile-line'></i> Dossiê do Estudante", unsafe_allow_html=True)
     
-    c1, c2, c3, c4 = st.columns([3, 2, 2, 1])
-    st.session_state.dados['nome'] = c1.text_input("Nome Completo", st.session_state.dados['nome'])
-    st.session_state.dados['nasc'] = c2.date_input("Nascimento", st.session_state.dados['nasc'])
-    st.session_state.dados['serie'] = c3.selectbox("Série/Ano", ["Infantil", "1º Ano", "2º Ano", "3º Ano", "4º Ano", "5º Ano", "Fund. II", "Ensino Médio"], placeholder="Selecione...")
-    st.session_state.dados['turma'] = c4.text_input("Turma", st.session_state.dados['turma'])
-
-    st.markdown("---")
-    st.markdown("##### 1. Contexto Escolar e Familiar")
-    ch, cf = st.columns(2)
-    with ch:
-        st.info("Trajetória escolar, retenções e relação com a aprendizagem.")
-        st.session_state.dados['historico'] = st.text_area("Histórico Escolar", st.session_state.dados['historico'], height=100, label_visibility="collapsed")
-    with cf:
-        st.info("Rotina, expectativas e estrutura familiar.")
-        st.session_state.dados['familia'] = st.text_area("Contexto Familiar", st.session_state.dados['familia'], height=100, label_visibility="collapsed")
-
-    st.markdown("##### 2. Saúde e Diagnóstico")
-    col_d, col_m = st.columns(2)
-    with col_d:
-        st.caption("Diagnóstico (Se vazio, será buscado no PDF anexo).")
-        st.session_state.dados['diagnostico'] = st.text_input("Diagnóstico Clínico", st.session_state.dados['diagnostico'], placeholder="Ex: TEA, TDAH...")
-    with col_m:
-        st.caption("Uso de Medicação (Para manejo de efeitos colaterais).")
-        st.session_state.dados['medicacao'] = st.text_input("Medicação em uso", st.session_state.dados['medicacao'], placeholder="Ex: Ritalina, Risperidona...")
+    with st.form("form_estudante", border=False):
+        c1, c2, c3, c4 = st.columns([3, 2, 2, 1])
+        nome = c1.text_input("Nome Completo", d['nome'])
+        nasc = c2.date_input("Nascimento", d['nasc'])
+        serie = c3.selectbox("Série/Ano", SERIES, index=SERIES.index(d['serie']) if d['serie'] in SERIES else 0, placeholder="Selecione...")
+        turma = c4.text_input("Turma", d['turma'])
+
+        st.markdown("---")
+        st.markdown("##### 1. Contexto Escolar e Familiar")
+        ch, cf = st.columns(2)
+        with ch:
+            st.info("Trajetória escolar, retenções e relação com a aprendizagem.")
+            historico = st.text_area("Histórico Escolar", d['historico'], height=100, label_visibility="collapsed")
+        with cf:
+            st.info("Rotina, expectativas e estrutura familiar.")
+            familia = st.text_area("Contexto Familiar", d['familia'], height=100, label_visibility="collapsed")
+
+        st.markdown("##### 2. Saúde e Diagnóstico")
+        col_d, col_m = st.columns(2)
+        with col_d:
+            st.caption("Diagnóstico (Se vazio, será buscado no PDF anexo).")
+            diagnostico = st.text_input("Diagnóstico Clínico", d['diagnostico'], placeholder="Ex: TEA, TDAH...")
+        with col_m:
+            st.caption("Uso de Medicação (Para manejo de efeitos colaterais).")
+            medicacao = st.text_input("Medicação em uso", d['medicacao'], placeholder="Ex: Ritalina, Risperidona...")
+        
+        if botao_salvar():
+            d.update(nome=nome, nasc=nasc, serie=serie, turma=turma, historico=historico, familia=familia, diagnostico=diagnostico, medicacao=medicacao)
+            autosalvar()
+            st.toast("Dados do estudante salvos.")
     
     with st.expander("📎 Anexar Laudo (PDF)"):
-        up = st.file_uploader("Arquivo PDF", type="pdf")
+        up = st.file_uploader("Arquivo PDF", type="pdf", key=f"laudo_{st.session_state.versao_estudante}")
         if up:
-            st.session_state.pdf_text = ler_pdf(up)
-            st.success("PDF Anexado!")
+            try:
+                info_laudo = ler_laudo(up)
+                st.session_state.pdf_text = info_laudo['texto']
+                st.success("PDF Anexado!")
+                st.caption(resumo_extracao(info_laudo))
+                autosalvar()
+            except Exception as e:
+                # A mensagem não vira laudo: iria para o prompt e marcaria "Vide laudo anexo" no PDF
+                st.session_state.pdf_text = ""
+                st.error(f"Erro ao ler PDF: {e}")
+                autosalvar()
 
 # TAB 2: REDE DE APOIO
-with tab2:
+@st.fragment
+@cronometrar("app.fragmento.rede_apoio")
+def aba_rede_apoio():
+    d = st.session_state.dados
     st.markdown("### <i class='ri-team-line'></i> Rede de Apoio", unsafe_allow_html=True)
     st.info("Profissionais externos que atendem o estudante.")
     
-    c_rede1, c_rede2 = st.columns(2)
-    st.session_state.dados['rede_apoio'] = c_rede1.multiselect(
-        "Profissionais:", 
-        ["Psicólogo", "Fonoaudiólogo", "Terapeuta Ocupacional", "Neuropediatra", "Psicopedagogo", "Professor Particular"],
-        placeholder="Selecione..."
-    )
-    st.session_state.dados['orientacoes_especialistas'] = st.text_area("Orientações Técnicas (Resumo)", placeholder="Recomendações clínicas...", height=150)
+    with st.form("form_rede", border=False):
+        c_rede1, c_rede2 = st.columns(2)
+        rede_apoio = c_rede1.multiselect(
+            "Profissionais:", 
+            ["Psicólogo", "Fonoaudiólogo", "Terapeuta Ocupacional", "Neuropediatra", "Psicopedagogo", "Professor Particular"],
+            default=d['rede_apoio'], placeholder="Selecione..."
+        )
+        orientacoes = st.text_area("Orientações Técnicas (Resumo)", d['orientacoes_especialistas'], placeholder="Recomendações clínicas...", height=150)
+        if botao_salvar():
+            d.update(rede_apoio=rede_apoio, orientacoes_especialistas=orientacoes)
+            autosalvar()
+            st.toast("Rede de apoio salva.")
 
 # TAB 3: MAPEAMENTO (CORRIGIDO E VISÍVEL)
-with tab3:
+@st.fragment
+@cronometrar("app.fragmento.mapeamento")
+def aba_mapeamento():
+    d = st.session_state.dados
     st.markdown("### <i class='ri-map-pin-user-line'></i> Mapeamento Integral", unsafe_allow_html=True)
     
-    # CONTAINER UNIFICADO PARA HIPERFOCO E POTENCIALIDADES (GARANTIA DE VISUALIZAÇÃO)
-    with st.container(border=True):
-        st.markdown("#### Potencialidades e Interesses")
-        c_pot1, c_pot2 = st.columns(2)
-        with c_pot1:
-            st.session_state.dados['hiperfoco'] = st.text_input("Hiperfoco (Interesses intensos)", placeholder="Ex: Dinossauros, Minecraft...")
-        with c_pot2:
-            st.session_state.dados['potencias'] = st.multiselect("Pontos Fortes / Habilidades", 
-                ["Memória Visual", "Lógica Matemática", "Criatividade", "Oralidade", "Tecnologia", "Artes", "Música"], 
-                placeholder="Selecione..."
-            )
-
-    st.markdown("#### Barreiras e Suporte")
-    c_bar1, c_bar2, c_bar3 = st.columns(3)
-    with c_bar1:
-        with st.container(border=True):
-            st.markdown("##### Sensorial")
-            st.session_state.dados['b_sensorial'] = st.multiselect("Barreiras:", ["Hipersensibilidade Auditiva", "Hipersensibilidade Visual", "Busca Sensorial", "Baixo Tônus"], key="b1", placeholder="Selecione...")
-            st.session_state.dados['sup_sensorial'] = st.select_slider("Suporte", ["Autônomo", "Monitorado", "Substancial", "Muito Substancial"], value="Monitorado", key="s1")
-    with c_bar2:
-        with st.container(border=True):
-            st.markdown("##### Cognitivo")
-            st.session_state.dados['b_cognitiva'] = st.multiselect("Barreiras:", ["Atenção", "Memória", "Rigidez Mental", "Processamento Lento"], key="b2", placeholder="Selecione...")
-            st.session_state.dados['sup_cognitiva'] = st.select_slider("Suporte", ["Autônomo", "Monitorado", "Substancial", "Muito Substancial"], value="Monitorado", key="s2")
-    with c_bar3:
+    with st.form("form_mapeamento", border=False):
+        # CONTAINER UNIFICADO PARA HIPERFOCO E POTENCIALIDADES (GARANTIA DE VISUALIZAÇÃO)
         with st.container(border=True):
-            st.markdown("##### Social")
-            st.session_state.dados['b_social'] = st.multiselect("Barreiras:", ["Interação", "Frustração", "Regras", "Isolamento"], key="b3", placeholder="Selecione...")
-            st.session_state.dados['sup_social'] = st.select_slider("Suporte", ["Autônomo", "Monitorado", "Substancial", "Muito Substancial"], value="Monitorado", key="s3")
+            st.markdown("#### Potencialidades e Interesses")
+            c_pot1, c_pot2 = st.columns(2)
+            with c_pot1:
+                hiperfoco = st.text_input("Hiperfoco (Interesses intensos)", d['hiperfoco'], placeholder="Ex: Dinossauros, Minecraft...")
+            with c_pot2:
+                potencias = st.multiselect("Pontos Fortes / Habilidades", 
+                    ["Memória Visual", "Lógica Matemática", "Criatividade", "Oralidade", "Tecnologia", "Artes", "Música"], 
+                    default=d['potencias'], placeholder="Selecione..."
+                )
+
+        st.markdown("#### Barreiras e Suporte")
+        c_bar1, c_bar2, c_bar3 = st.columns(3)
+        with c_bar1:
+            with st.container(border=True):
+                st.markdown("##### Sensorial")
+                b_sensorial = st.multiselect("Barreiras:", ["Hipersensibilidade Auditiva", "Hipersensibilidade Visual", "Busca Sensorial", "Baixo Tônus"], default=d['b_sensorial'], key="b1", placeholder="Selecione...")
+                sup_sensorial = st.select_slider("Suporte", NIVEIS_SUPORTE, value=nivel_suporte(d['sup_sensorial']), key="s1")
+        with c_bar2:
+            with st.container(border=True):
+                st.markdown("##### Cognitivo")
+                b_cognitiva = st.multiselect("Barreiras:", ["Atenção", "Memória", "Rigidez Mental", "Processamento Lento"], default=d['b_cognitiva'], key="b2", placeholder="Selecione...")
+                sup_cognitiva = st.select_slider("Suporte", NIVEIS_SUPORTE, value=nivel_suporte(d['sup_cognitiva']), key="s2")
+        with c_bar3:
+            with st.container(border=True):
+                st.markdown("##### Social")
+                b_social = st.multiselect("Barreiras:", ["Interação", "Frustração", "Regras", "Isolamento"], default=d['b_social'], key="b3", placeholder="Selecione...")
+                sup_social = st.select_slider("Suporte", NIVEIS_SUPORTE, value=nivel_suporte(d['sup_social']), key="s3")
+        
+        if botao_salvar():
+            d.update(hiperfoco=hiperfoco, potencias=potencias, b_sensorial=b_sensorial, sup_sensorial=sup_sensorial,
+                     b_cognitiva=b_cognitiva, sup_cognitiva=sup_cognitiva, b_social=b_social, sup_social=sup_social)
+            autosalvar()
+            st.toast("Mapeamento salvo.")
 
 # TAB 4: PLANO DE AÇÃO (TERMOS CORRIGIDOS)
-with tab4:
+@st.fragment
+@cronometrar("app.fragmento.plano_acao")
+def aba_plano_acao():
+    d = st.session_state.dados
     st.markdown("### <i class='ri-tools-line'></i> Estratégias Pedagógicas", unsafe_allow_html=True)
     st.caption("Recursos de Desenho Universal para Aprendizagem (DUA).")
     
-    c_acesso, c_ensino = st.columns(2)
-    with c_acesso:
-        st.markdown("#### 1. Acesso ao Currículo")
-        st.session_state.dados['estrategias_acesso'] = st.multiselect(
-            "Recursos de Acessibilidade:", 
-            ["Tempo Estendido (+25%)", "Apoio à Leitura e Escrita", "Material Ampliado", "Sala com Redução de Estímulos", "Tecnologia Assistiva", "Pausas Sensoriais"],
-            placeholder="Selecione..."
-        )
-    with c_ensino:
-        st.markdown("#### 2. Metodologia de Ensino")
-        st.session_state.dados['estrategias_ensino'] = st.multiselect(
-            "Estratégias Didáticas:", 
-            ["Fragmentação de Tarefas", "Pistas Visuais", "Enriquecimento Curricular (AH/SD)", "Antecipação de Rotina", "Projetos Práticos"],
-            placeholder="Selecione..."
+    with st.form("form_plano", border=False):
+        c_acesso, c_ensino = st.columns(2)
+        with c_acesso:
+            st.markdown("#### 1. Acesso ao Currículo")
+            acesso = st.multiselect(
+                "Recursos de Acessibilidade:", 
+                ["Tempo Estendido (+25%)", "Apoio à Leitura e Escrita", "Material Ampliado", "Sala com Redução de Estímulos", "Tecnologia Assistiva", "Pausas Sensoriais"],
+                default=d['estrategias_acesso'], placeholder="Selecione..."
+            )
+        with c_ensino:
+            st.markdown("#### 2. Metodologia de Ensino")
+            ensino = st.multiselect(
+                "Estratégias Didáticas:", 
+                ["Fragmentação de Tarefas", "Pistas Visuais", "Enriquecimento Curricular (AH/SD)", "Antecipação de Rotina", "Projetos Práticos"],
+                default=d['estrategias_ensino'], placeholder="Selecione..."
+            )
+        
+        st.write("")
+        st.markdown("#### 3. Avaliação")
+        avaliacao = st.multiselect(
+            "Formato Avaliativo:", 
+            ["Prova Adaptada", "Consulta Permitida", "Avaliação Oral", "Trabalho Prático", "Enunciados Curtos"],
+            default=d['estrategias_avaliacao'], placeholder="Selecione..."
         )
-    
-    st.write("")
-    st.markdown("#### 3. Avaliação")
-    st.session_state.dados['estrategias_avaliacao'] = st.multiselect(
-        "Formato Avaliativo:", 
-        ["Prova Adaptada", "Consulta Permitida", "Avaliação Oral", "Trabalho Prático", "Enunciados Curtos"],
-        placeholder="Selecione..."
-    )
+        if botao_salvar():
+            d.update(estrategias_acesso=acesso, estrategias_ensino=ensino, estrategias_avaliacao=avaliacao)
+            autosalvar()
+            st.toast("Plano de ação salvo.")
+
+    # Índice local: sem chamada à IA; são as mesmas candidatas que entram no prompt da seção BNCC
+    habilidades = candidatas(d)
+    if habilidades:
+        with st.expander("📚 Habilidades BNCC sugeridas para o perfil"):
+            for h in habilidades: st.markdown(f"**{h['codigo']}** · {h['componente']} — {h['descricao']}")
 
 # TAB 5: IA
-with tab5:
+# A geração vai para a fila de tarefas do processo; a aba só acompanha o andamento.
+@st.fragment(run_every=1.0)
+@cronometrar("app.fragmento.consultoria.andamento")
+def acompanhar_tarefa():
+    situacao_ia = situacao(st.session_state.tarefa_ia)
+    if situacao_ia is None or situacao_ia['estado'] in (CONCLUIDA, ERRO):
+        # Rerun completo: a aba Documento precisa enxergar o novo parecer
+        st.rerun()
+    if situacao_ia['estado'] == NA_FILA:
+        aviso = f"⏳ Na fila, posição {situacao_ia['posicao']}..."
+        if situacao_ia['limite']: aviso += f" Limite de gerações atingido: começa em ~{situacao_ia['limite']} s."
+        st.info(aviso)
+    else:
+        st.caption(f"✍️ Escrevendo o parecer... {situacao_ia['segundos']:.0f} s")
+        st.markdown(situacao_ia['texto'])
+
+@st.fragment
+@cronometrar("app.fragmento.consultoria")
+def aba_consultoria():
     st.markdown("### <i class='ri-robot-2-line'></i> Consultoria Pedagógica", unsafe_allow_html=True)
+    tarefa_id = st.session_state.get('tarefa_ia')
+    if tarefa_id:
+        situacao_ia = situacao(tarefa_id)
+        if situacao_ia is None or situacao_ia['estado'] in (CONCLUIDA, ERRO):
+            del st.session_state['tarefa_ia']; descartar(tarefa_id); tarefa_id = None
+            if situacao_ia is None: st.warning("A geração anterior expirou. Gere o plano novamente.")
+            elif situacao_ia['estado'] == ERRO: st.error(situacao_ia['erro'])
+            else:
+                st.session_state.dados['ia_sugestao'] = situacao_ia['texto']
+                autosalvar()
+                st.session_state.aviso_ia = True
     col_btn, col_txt = st.columns([1, 2])
     with col_btn:
         st.info("A IA cruza Perfil, Laudo, Medicação e BNCC para criar o plano.")
-        if st.button("GERAR PLANO", type="primary"):
+        regenerar = st.checkbox("Regenerar mesmo assim", help="Ignora o plano já gerado para estes mesmos dados e consulta a IA novamente.")
+        if st.session_state.pop('aviso_ia', None): st.success("Gerado!")
+        if st.button("GERAR PLANO", type="primary", disabled=tarefa_id is not None):
             if not st.session_state.dados['nome']: st.error("Preencha o Nome.")
+            elif not api_key: st.error("⚠️ Configure a Chave API OpenAI na barra lateral.")
             else:
-                with st.spinner("Processando..."):
-                    res, err = consultar_gpt(api_key, st.session_state.dados, st.session_state.pdf_text)
-                    if err: st.error(err)
-                    else: st.session_state.dados['ia_sugestao'] = res; st.success("Gerado!")
+                st.session_state.tarefa_ia = enviar(api_key, st.session_state.dados, st.session_state.pdf_text, regenerar, sessao=st.session_state.sessao_id)
+                st.rerun()
     with col_txt:
-        if st.session_state.dados['ia_sugestao']:
+        if tarefa_id: acompanhar_tarefa()
+        elif st.session_state.dados['ia_sugestao']:
             st.text_area("Parecer Técnico:", st.session_state.dados['ia_sugestao'], height=500)
         else:
             st.markdown("<div style='padding:50px; text-align:center; color:#CBD5E0; border:2px dashed #E2E8F0; border-radius:12px;'>O plano aparecerá aqui.</div>", unsafe_allow_html=True)
 
 # TAB 6: DOCUMENTO
-with tab6:
+@st.fragment
+@cronometrar("app.fragmento.documento")
+def aba_documento():
     st.markdown("### <i class='ri-file-pdf-line'></i> Exportação", unsafe_allow_html=True)
     if st.session_state.dados['ia_sugestao']:
         c_pdf, c_word = st.columns(2)
         tem_anexo = len(st.session_state.pdf_text) > 0
         
+        # Documentos gerados só no clique, a partir de uma cópia dos dados atuais
+        dados_doc = dict(st.session_state.dados)
         with c_pdf:
-            pdf_bytes = gerar_pdf(st.session_state.dados, tem_anexo)
-            st.download_button("📥 Baixar PDF", pdf_bytes, f"PEI_{st.session_state.dados['nome']}.pdf", "application/pdf", type="primary")
+            st.download_button("📥 Baixar PDF", partial(exportar, gerar_pdf, dados_doc, tem_anexo), f"PEI_{st.session_state.dados['nome']}.pdf", "application/pdf", type="primary")
         with c_word:
-            docx_bytes = gerar_docx(st.session_state.dados)
-            st.download_button("📥 Baixar Word", docx_bytes, f"PEI_{st.session_state.dados['nome']}.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+            st.download_button("📥 Baixar Word", partial(exportar, gerar_docx, dados_doc), f"PEI_{st.session_state.dados['nome']}.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
     else:
         st.warning("Gere o plano na aba de IA primeiro.")
+    exportacao_turma()
+
+# Turma inteira: PEIs salvos renderizados em paralelo e gravados num ZIP em disco, sem passar pela memória
+def exportacao_turma():
+    st.markdown("---")
+    st.markdown("#### 📦 Exportar Turma")
+    turmas = armazenamento.turmas()
+    if not turmas:
+        st.caption("Nenhum PEI salvo ainda."); return
+    c_turma, c_formatos = st.columns([2, 1])
+    turma = c_turma.selectbox("Turma", turmas, format_func=lambda t: f"{t['serie'] or 'Sem série'} — {t['turma'] or 'sem turma'} ({t['total']} PEIs)")
+    formatos = c_formatos.multiselect("Formatos", ["pdf", "docx"], default=["pdf", "docx"], format_func=str.upper)
+    if st.button("📦 Gerar ZIP da turma", disabled=not formatos):
+        st.session_state.autosave.descarregar()  # o estudante aberto entra com as últimas alterações
+        anterior = st.session_state.pop('zip_turma', None)
+        if anterior and os.path.exists(anterior['caminho']): os.unlink(anterior['caminho'])
+        ids = [e['id'] for e in armazenamento.listar(serie=turma['serie'] or "", turma=turma['turma'], limite=turma['total'])]
+        caminho = arquivo_zip()
+        barra = st.progress(0.0, text="Gerando documentos...")
+        resumo = exportar_turma(armazenamento, ids, caminho, formatos, lambda feitos, total: barra.progress(feitos / total, text=f"{feitos} de {total} estudantes"))
+        nome = f"PEIs_{turma['serie'] or 'sem_serie'}_{turma['turma'] or 'sem_turma'}.zip".replace(" ", "_")
+        st.session_state.zip_turma = {"caminho": caminho, "nome": nome, "resumo": resumo}
+    zip_turma = st.session_state.get('zip_turma')
+    if zip_turma and os.path.exists(zip_turma['caminho']):
+        resumo = zip_turma['resumo']
+        st.success(f"{resumo['arquivos']} arquivos de {resumo['total'] - len(resumo['falhas'])} estudantes em {resumo['segundos']:.1f} s.")
+        for estudante_id, erro in resumo['falhas']: st.warning(f"PEI {estudante_id} não exportado: {erro}")
+        st.download_button("📥 Baixar ZIP", Path(zip_turma['caminho']).read_bytes, zip_turma['nome'], "application/zip", type="primary")
+
+with tab1: aba_estudante()
+with tab2: aba_rede_apoio()
+with tab3: aba_mapeamento()
+with tab4: aba_plano_acao()
+with tab5: aba_consultoria()
+with tab6: aba_documento()
 
 st.markdown("---")
 st.markdown("<div style='text-align: center; color: #A0AEC0; font-size: 0.8rem;'>PEI 360º v3.5 | Powered by OpenAI</div>", unsafe_allow_html=True)
+registro.observar("app.rerun", time.perf_counter() - inicio_rerun)
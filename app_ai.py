@@ -1,46 +1,21 @@
 import streamlit as st
 from datetime import date
-from io import BytesIO
-from docx import Document
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.shared import Pt
-from openai import OpenAI
-from pypdf import PdfReader
-from fpdf import FPDF
-import base64
-import os
-import re
+from pei.ativos import ativos, encontrar_logo
+from pei.cliente import PROVEDOR
+from pei.dados import dados_vazios
+from pei.documento import gerar_docx, gerar_pdf, limpar_texto_pdf
+from pei.exportacao import exportar
+from pei.ia import consultar_gpt
+from pei.laudo import ler_pdf
+from functools import partial
 
 st.set_page_config(page_title="PEI 360º", page_icon="📘", layout="wide", initial_sidebar_state="expanded")
 
-def f1():
-    p = ["360.png", "360.jpg", "logo.png", "logo.jpg", "iconeaba.png"]
-    for n in p:
-        if os.path.exists(n): return n
-    return None
-
-def f2(i):
-    if not i: return ""
-    with open(i, "rb") as f: return base64.b64encode(f.read()).decode()
-
-def f3(a):
-    if a is None: return ""
-    try:
-        r = PdfReader(a)
-        t = ""
-        for i, p in enumerate(r.pages):
-            if i >= 6: break
-            t += p.extract_text() + "\n"
-        return t
-    except Exception as e: return f"Erro: {e}"
-
-def f4(t):
-    if not t: return ""
-    t = t.replace('**', '').replace('__', '')
-    t = t.replace('### ', '').replace('## ', '').replace('# ', '')
-    t = t.replace('* ', '• ')
-    t = re.sub(r'[^\x00-\xff]', '', t)
-    return t
+def f1(): return encontrar_logo()
+
+def f3(a): return ler_pdf(a)
+
+def f4(t): return limpar_texto_pdf(t)
 
 st.markdown("""
 <link href="https://cdn.jsdelivr.net/npm/remixicon@4.1.0/fonts/remixicon.css" rel="stylesheet">
@@ -61,75 +36,14 @@ div[data-testid="column"] .stButton button { border-radius: 12px !important; fon
 </style>
 """, unsafe_allow_html=True)
 
-def f5(k, d, c=""):
-    if not k: return None, "⚠️ Configure a Chave API."
-    try:
-        client = OpenAI(api_key=k)
-        cs = c[:5000] if c else "Sem laudo."
-        is_ahsd = "altas habilidades" in d['diagnostico'].lower() or "superdotação" in d['diagnostico'].lower()
-        f = "ENRIQUECIMENTO" if is_ahsd else "FLEXIBILIZAÇÃO"
-        ps = "Neuropsicopedagogo Sênior. Tarefa: Redigir o PEI."
-        pu = f"""
-        ESTUDANTE: {d['nome']} | Série: {d['serie']}
-        DIAGNÓSTICO: {d['diagnostico']} ({f})
-        MEDICAÇÃO: {d['medicacao']}
-        HIPERFOCO: {d['hiperfoco']}
-        PONTOS FORTES: {', '.join(d['potencias'])}
-        CONTEXTO: {d['historico']} | {d['familia']}
-        REDE: {', '.join(d['rede_apoio'])} | {d['orientacoes_especialistas']}
-        BARREIRAS SENSORIAL: {', '.join(d['b_sensorial'])}
-        BARREIRAS COGNITIVO: {', '.join(d['b_cognitiva'])}
-        BARREIRAS SOCIAL: {', '.join(d['b_social'])}
-        ESTRATÉGIAS ACESSO: {', '.join(d['estrategias_acesso'])}
-        ESTRATÉGIAS ENSINO: {', '.join(d['estrategias_ensino'])}
-        ESTRATÉGIAS AVALIAÇÃO: {', '.join(d['estrategias_avaliacao'])}
-        LAUDO PDF: {cs}
-        """
-        r = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "system", "content": ps}, {"role": "user", "content": pu}], temperature=0.7)
-        return r.choices[0].message.content, None
-    except Exception as e: return None, f"Erro: {str(e)}."
-
-class PDF(FPDF):
-    def header(self):
-        self.set_draw_color(0, 78, 146); self.set_line_width(0.4); self.rect(5, 5, 200, 287)
-        logo = f1()
-        if logo: self.image(logo, 12, 12, 22); x = 40
-        else: x = 12
-        self.set_xy(x, 15); self.set_font('Arial', 'B', 14); self.set_text_color(0, 78, 146); self.cell(0, 8, 'PLANO DE ENSINO INDIVIDUALIZADO', 0, 1, 'L')
-        self.set_xy(x, 22); self.set_font('Arial', 'I', 9); self.set_text_color(100); self.cell(0, 5, 'Documento Oficial', 0, 1, 'L'); self.ln(15)
-    def footer(self):
-        self.set_y(-15); self.set_font('Arial', 'I', 8); self.set_text_color(128); self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
-    def section_title(self, l):
-        self.ln(5); self.set_fill_color(240, 248, 255); self.set_text_color(0, 78, 146); self.set_font('Arial', 'B', 11); self.cell(0, 8, f"  {l}", 0, 1, 'L', fill=True); self.ln(3)
-
-def f6(d, a):
-    pdf = PDF(); pdf.add_page(); pdf.set_auto_page_break(auto=True, margin=20)
-    pdf.section_title("1. IDENTIFICAÇÃO")
-    pdf.set_font("Arial", size=10); pdf.set_text_color(0)
-    n = d['nasc'].strftime('%d/%m/%Y') if d['nasc'] else "-"
-    dd = d['diagnostico'] if d['diagnostico'] else ("Em análise" if a else "Não informado")
-    md = d['medicacao'] if d['medicacao'] else "Não faz uso"
-    t = f"Nome: {d['nome']}\nNascimento: {n}\nSérie: {d['serie']} | Turma: {d['turma']}\nDiagnóstico: {dd}\nMedicação: {md}"
-    pdf.multi_cell(0, 6, f4(t))
-    if d['rede_apoio'] or d['orientacoes_especialistas']:
-        pdf.ln(3); pdf.set_font("Arial", 'B', 10); pdf.cell(0, 6, "Suporte:", 0, 1); pdf.set_font("Arial", size=10)
-        p = ', '.join(d['rede_apoio']) if d['rede_apoio'] else "-"; o = d['orientacoes_especialistas'] if d['orientacoes_especialistas'] else "-"
-        pdf.multi_cell(0, 6, f4(f"Profissionais: {p}.\nOrientações: {o}"))
-    if d['ia_sugestao']: pdf.ln(5); pdf.multi_cell(0, 6, f4(d['ia_sugestao']))
-    pdf.ln(20); y = pdf.get_y(); if y > 250: pdf.add_page(); y = 40
-    pdf.line(20, y, 90, y); pdf.line(120, y, 190, y); pdf.set_font("Arial", 'I', 8); pdf.text(35, y+5, "Coordenação"); pdf.text(135, y+5, "Família")
-    return pdf.output(dest='S').encode('latin-1', 'replace')
-
-def f7(d):
-    doc = Document(); s = doc.styles['Normal']; s.font.name = 'Arial'; s.font.size = Pt(11)
-    doc.add_heading('PLANO DE ENSINO INDIVIDUALIZADO', 0)
-    doc.add_paragraph(f"Estudante: {d['nome']}"); doc.add_paragraph(f"Série: {d['serie']} | Turma: {d['turma']}")
-    doc.add_paragraph(f"Diagnóstico: {d['diagnostico']}"); doc.add_paragraph(f"Medicação: {d['medicacao']}")
-    if d['ia_sugestao']: doc.add_heading('Parecer Pedagógico', level=1); doc.add_paragraph(d['ia_sugestao'])
-    b = BytesIO(); doc.save(b); b.seek(0); return b
+def f5(k, d, c=""): return consultar_gpt(k, d, c)
+
+def f6(d, a): return gerar_pdf(d, a)
+
+def f7(d): return gerar_docx(d)
 
 if 'dados' not in st.session_state:
-    st.session_state.dados = {'nome': '', 'nasc': None, 'serie': None, 'turma': '', 'diagnostico': '', 'medicacao': '', 'historico': '', 'familia': '', 'hiperfoco': '', 'potencias': [], 'rede_apoio': [], 'orientacoes_especialistas': '', 'b_sensorial': [], 'sup_sensorial': '🟡 Monitorado', 'b_cognitiva': [], 'sup_cognitiva': '🟡 Monitorado', 'b_social': [], 'sup_social': '🟡 Monitorado', 'estrategias_acesso': [], 'estrategias_ensino': [], 'estrategias_avaliacao': [], 'ia_sugestao': ''}
+    st.session_state.dados = dados_vazios()
 if 'pdf_text' not in st.session_state: st.session_state.pdf_text = ""
 if 'auth' not in st.session_state: st.session_state.auth = False
 
@@ -142,14 +56,15 @@ with st.sidebar:
                 st.rerun()
             else: st.error("Senha incorreta")
         st.stop()
-    logo = f1()
-    if logo: st.image(logo, width=120)
-    if 'OPENAI_API_KEY' in st.secrets: api_key = st.secrets['OPENAI_API_KEY']; st.success("✅ OpenAI Ativa")
+    la = ativos()
+    if la["cabecalho"]: st.image(la["cabecalho"], width=120)
+    if PROVEDOR == "simulado": api_key = "simulado"; st.info("🧪 Provedor simulado")
+    elif 'OPENAI_API_KEY' in st.secrets: api_key = st.secrets['OPENAI_API_KEY']; st.success("✅ OpenAI Ativa")
     else: api_key = st.text_input("Chave OpenAI:", type="password")
     st.markdown("---"); st.markdown("<div style='font-size:0.8rem; color:#A0AEC0;'>PEI 360º v3.5</div>", unsafe_allow_html=True)
 
-logo_path = f1(); b64_logo = f2(logo_path); mime = "image/png" if logo_path and logo_path.endswith("png") else "image/jpeg"
-img_html = f'<img src="data:{mime};base64,{b64_logo}" style="height: 70px;">' if logo_path else ""
+la = ativos()
+img_html = f'<img src="data:{la["cabecalho_mime"]};base64,{la["cabecalho_b64"]}" style="height: 70px;">' if la["logo"] else ""
 st.markdown(f'<div class="unified-card header-content">{img_html}<div><p style="margin: 0; color: #004E92; font-size: 1.2rem; font-weight: 700;">Ecossistema de Inteligência Pedagógica</p></div></div>', unsafe_allow_html=True)
 
 abas = ["Início", "Estudante", "Rede de Apoio", "Mapeamento", "Plano de Ação", "Consultoria IA", "Documento"]
@@ -245,8 +160,9 @@ with tab6:
     st.markdown("### <i class='ri-file-pdf-line'></i> Exportação", unsafe_allow_html=True)
     if st.session_state.dados['ia_sugestao']:
         c_pdf, c_word = st.columns(2); a = len(st.session_state.pdf_text) > 0
-        with c_pdf: pdf_bytes = f6(st.session_state.dados, a); st.download_button("📥 Baixar PDF", pdf_bytes, f"PEI_{st.session_state.dados['nome']}.pdf", "application/pdf", type="primary")
-        with c_word: docx_bytes = f7(st.session_state.dados); st.download_button("📥 Baixar Word", docx_bytes, f"PEI_{st.session_state.dados['nome']}.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+        d = dict(st.session_state.dados)
+        with c_pdf: st.download_button("📥 Baixar PDF", partial(exportar, f6, d, a), f"PEI_{st.session_state.dados['nome']}.pdf", "application/pdf", type="primary")
+        with c_word: st.download_button("📥 Baixar Word", partial(exportar, f7, d), f"PEI_{st.session_state.dados['nome']}.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
     else: st.warning("Gere o plano na aba de IA primeiro.")
 
 st.markdown("---"); st.markdown('<div style="text-align: center; color: #A0AEC0; font-size: 0.8rem;">PEI 360º v3.5</div>', unsafe_allow_html=True)
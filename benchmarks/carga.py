@@ -0,0 +1,197 @@
+import atexit
+import os
+import shutil
+import tempfile
+_pasta = tempfile.mkdtemp(prefix="pei_carga_")
+atexit.register(shutil.rmtree, _pasta, True)
+# Antes de importar o pei: provedor simulado, banco e cache descartáveis (sem rede, sem estado anterior)
+os.environ.setdefault("PEI_PROVEDOR", "simulado")
+os.environ.setdefault("PEI_CACHE_DIR", os.path.join(_pasta, "cache"))
+os.environ.setdefault("PEI_BANCO", os.path.join(_pasta, "pei.sqlite"))
+import argparse
+import json
+import resource
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# --- TESTE DE CARGA (N SESSÕES DO APP REAL) ---
+# Cada sessão é um AppTest do app.py no mesmo processo, como as sessões de um servidor Streamlit:
+# preenche Estudante, anexa um laudo sintético, preenche Mapeamento e Plano de Ação, gera o plano
+# pelo provedor simulado e exporta PDF e DOCX. Mede cada rerun, a memória por sessão e a vazão.
+# O AppTest troca singletons globais do Streamlit a cada execução, então os reruns das sessões passam
+# um de cada vez (trava `_vez`), como scripts disputando o GIL num servidor; a geração na fila e as
+# pausas entre interações continuam simultâneas. Latência percebida = espera pela vez + execução.
+# Uso: python -m benchmarks.carga -n 10 [--latencia 0.3 --tokens-s 80 --taxa-429 0.05] [--json saida.json]
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(RAIZ, "app.py")
+PERCENTIS = (50, 90, 95, 99)
+_vez = threading.Lock()
+
+def rss_mb():
+    # Memória residente atual do processo (Linux); fora dele, o pico
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError: return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def percentis(valores):
+    if not valores: return {}
+    ordenados = sorted(valores)
+    def p(q): return ordenados[min(len(ordenados) - 1, int(round(q / 100 * (len(ordenados) - 1))))]
+    return {**{f"p{q}": round(p(q), 1) for q in PERCENTIS}, "max": round(ordenados[-1], 1), "n": len(ordenados)}
+
+class Sessao:
+    def __init__(self, indice, laudo, intervalo, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.indice = indice
+        self.laudo = laudo
+        self.intervalo = intervalo
+        self.at = AppTest.from_file(APP, default_timeout=timeout)
+        self.tempos = defaultdict(list)  # etapa -> ms percebidos em cada rerun (espera + execução)
+        self.esperas = []
+        self.erros = []
+
+    def rodar(self, etapa):
+        inicio = time.perf_counter()
+        with _vez:
+            vez = time.perf_counter()
+            self.at.run()
+        fim = time.perf_counter()
+        self.tempos[etapa].append((fim - inicio) * 1000)
+        self.esperas.append((vez - inicio) * 1000)
+        self.erros.extend(f"{etapa}: {e.value}" for e in self.at.exception)
+
+    def botao(self, rotulo, ordem=0):
+        return [b for b in self.at.button if b.label == rotulo][ordem]
+
+    def multiselect(self, rotulo, *opcoes, chave=None):
+        widget = self.at.multiselect(key=chave) if chave else [m for m in self.at.multiselect if m.label == rotulo][0]
+        for opcao in opcoes: widget.select(opcao)
+
+    def executar(self):
+        at = self.at
+        self.rodar("abrir")
+        # Estudante
+        [t for t in at.text_input if t.label == "Nome Completo"][0].input(f"Estudante {self.indice:03d}")
+        [s for s in at.selectbox if s.label == "Série/Ano"][0].select("3º Ano")
+        [t for t in at.text_input if t.label == "Diagnóstico Clínico"][0].input("TEA nível 1; TDAH")
+        [t for t in at.text_input if t.label == "Medicação em uso"][0].input("Metilfenidato 10 mg")
+        [t for t in at.text_area if t.label == "Histórico Escolar"][0].input("Alfabetizado no 2º ano, dificuldade em tarefas longas.")
+        self.botao("💾 Salvar", 0).click(); self.rodar("estudante")
+        at.file_uploader[0].set_value((f"laudo_{self.indice:03d}.pdf", self.laudo, "application/pdf")); self.rodar("laudo")
+        # Mapeamento
+        self.multiselect(None, "Hipersensibilidade Auditiva", chave="b1")
+        self.multiselect(None, "Atenção", "Memória", chave="b2")
+        self.multiselect(None, "Frustração", chave="b3")
+        self.botao("💾 Salvar", 2).click(); self.rodar("mapeamento")
+        # Plano de Ação
+        self.multiselect("Recursos de Acessibilidade:", "Tempo Estendido (+25%)", "Pausas Sensoriais")
+        self.multiselect("Estratégias Didáticas:", "Fragmentação de Tarefas", "Pistas Visuais")
+        self.multiselect("Formato Avaliativo:", "Prova Adaptada", "Avaliação Oral")
+        self.botao("💾 Salvar", 3).click(); self.rodar("plano")
+        # Consultoria: envia para a fila e acompanha como o fragmento faria (um rerun a cada `intervalo`)
+        inicio = time.perf_counter()
+        self.botao("GERAR PLANO").click(); self.rodar("gerar")
+        while "tarefa_ia" in at.session_state:
+            time.sleep(self.intervalo); self.rodar("acompanhar")
+        self.geracao_s = time.perf_counter() - inicio
+        self.erros.extend(f"geração: {e.value}" for e in at.error)
+        if not at.session_state.dados["ia_sugestao"]: self.erros.append("geração: parecer vazio")
+        # Documento: o download chama exportar() só no clique; aqui a mesma chamada, medida à parte
+        self.rodar("documento")
+        from pei.documento import gerar_docx, gerar_pdf
+        from pei.exportacao import exportar
+        dados = dict(at.session_state.dados)
+        inicio = time.perf_counter()
+        exportar(gerar_pdf, dados, bool(at.session_state.pdf_text)); exportar(gerar_docx, dados)
+        self.tempos["exportar"].append((time.perf_counter() - inicio) * 1000)
+
+def executar_carga(sessoes, paginas_laudo=3, laudo_compartilhado=False, intervalo=0.5, timeout=120):
+    from benchmarks.sinteticos import SEMENTE, pdf_laudo
+    from pei.tarefas import MAX_TRABALHADORES
+    laudos = {}
+    def laudo(i):
+        semente = SEMENTE if laudo_compartilhado else SEMENTE + i
+        if semente not in laudos: laudos[semente] = pdf_laudo(paginas_laudo, semente)
+        return laudos[semente]
+
+    # Aquecimento: imports do script e do pei fora da medição de memória e de latência
+    aquecimento = Sessao(-1, laudo(-1), intervalo, timeout); aquecimento.rodar("abrir"); del aquecimento
+    memoria_antes = rss_mb()
+    lista = [Sessao(i, laudo(i), intervalo, timeout) for i in range(sessoes)]
+    barreira = threading.Barrier(sessoes)
+    def rodar(sessao):
+        barreira.wait()  # todas começam juntas
+        inicio = time.perf_counter()
+        try: sessao.executar()
+        except Exception as e: sessao.erros.append(f"{type(e).__name__}: {e}")
+        sessao.segundos = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessoes) as pool: list(pool.map(rodar, lista))
+    total_s = time.perf_counter() - inicio
+    memoria_depois = rss_mb()  # sessões ainda vivas: estado + widgets de cada uma
+
+    por_etapa = defaultdict(list)
+    for s in lista:
+        for etapa, tempos in s.tempos.items(): por_etapa[etapa].extend(tempos)
+    reruns = [t for etapa, tempos in por_etapa.items() if etapa != "exportar" for t in tempos]
+    concluidas = [s for s in lista if not s.erros]
+    geracoes = [s.geracao_s for s in lista if hasattr(s, "geracao_s")]
+    return {
+        "sessoes": sessoes,
+        "concluidas": len(concluidas),
+        "erros": [f"sessão {s.indice}: {e}" for s in lista for e in s.erros],
+        "trabalhadores_ia": MAX_TRABALHADORES,
+        "segundos": round(total_s, 2),
+        "peis_por_minuto": round(len(concluidas) / total_s * 60, 1),
+        "reruns_por_segundo": round(len(reruns) / total_s, 1),
+        "sessao_ms": percentis([s.segundos * 1000 for s in lista]),
+        "geracao_s": round(statistics.median(geracoes), 2) if geracoes else None,
+        "rerun_ms": percentis(reruns),
+        "espera_ms": percentis([t for s in lista for t in s.esperas]),
+        "etapas_ms": {etapa: percentis(tempos) for etapa, tempos in por_etapa.items()},
+        "memoria_mb": {"antes": round(memoria_antes, 1), "depois": round(memoria_depois, 1),
+                       "por_sessao": round((memoria_depois - memoria_antes) / sessoes, 2),
+                       "pico": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)},
+    }
+
+def _linha(nome, p):
+    return f"{nome:14} " + " ".join(f"{p.get(k, 0):>9.1f}" for k in ("p50", "p90", "p95", "p99", "max")) + f" {p.get('n', 0):>6}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do app.py com N sessões simultâneas")
+    parser.add_argument("-n", "--sessoes", type=int, default=5)
+    parser.add_argument("--paginas-laudo", type=int, default=3)
+    parser.add_argument("--laudo-compartilhado", action="store_true", help="todas as sessões anexam o mesmo PDF (cache de laudos)")
+    parser.add_argument("--intervalo", type=float, default=0.5, help="segundos entre reruns de acompanhamento da geração")
+    parser.add_argument("--latencia", type=float, help="provedor simulado: segundos até o primeiro token")
+    parser.add_argument("--tokens-s", type=float, help="provedor simulado: tokens por segundo")
+    parser.add_argument("--taxa-429", type=float, help="provedor simulado: fração de pedidos recusados")
+    parser.add_argument("--json", help="grava o relatório completo neste arquivo")
+    args = parser.parse_args(argv)
+
+    from pei import simulado
+    for chave, valor in (("latencia", args.latencia), ("tokens_s", args.tokens_s), ("taxa_429", args.taxa_429)):
+        if valor is not None: simulado.config[chave] = valor
+    r = executar_carga(args.sessoes, args.paginas_laudo, args.laudo_compartilhado, args.intervalo)
+
+    print(f"{r['concluidas']}/{r['sessoes']} sessões em {r['segundos']} s | {r['peis_por_minuto']} PEIs/min | "
+          f"{r['reruns_por_segundo']} reruns/s | geração (mediana) {r['geracao_s']} s | {r['trabalhadores_ia']} trabalhadores de IA")
+    m = r["memoria_mb"]
+    print(f"memória: {m['antes']} -> {m['depois']} MB ({m['por_sessao']} MB/sessão, pico {m['pico']} MB)")
+    print(f"{'(ms)':14} {'p50':>9} {'p90':>9} {'p95':>9} {'p99':>9} {'max':>9} {'n':>6}")
+    print(_linha("rerun", r["rerun_ms"]))
+    print(_linha("  (espera)", r["espera_ms"]))
+    for etapa, p in r["etapas_ms"].items(): print(_linha(f"  {etapa}", p))
+    print(_linha("sessão", r["sessao_ms"]))
+    for erro in r["erros"][:20]: print(f"ERRO {erro}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(r, f, ensure_ascii=False, indent=2)
+    return 1 if r["erros"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
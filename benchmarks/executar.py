@@ -0,0 +1,202 @@
+import os
+os.environ["PEI_CACHE_DIR"] = ""  # sem cache em disco: cada repetição faz o trabalho inteiro
+import argparse
+import gc
+import json
+import platform
+import re
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+# --- BENCHMARKS DOS CAMINHOS QUENTES ---
+# Uso (na raiz do repositório, sem rede e sem Streamlit):
+#   python -m benchmarks.executar                 compara com benchmarks/baseline.json
+#   python -m benchmarks.executar --gravar        regrava a linha de base nesta máquina
+#   python -m benchmarks.executar -f pdf -r 10    só os casos com "pdf" no nome, 10 repetições
+# Sai com código 1 se algum caso ficar mais lento que a linha de base além do limite.
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+LIMITE = 0.5        # 50% acima do tempo gravado (máquinas compartilhadas oscilam ~30%)
+CRITERIO = "min_ms" # o mínimo oscila menos que a mediana em máquinas compartilhadas
+CONFIRMACOES = 2    # novas medições antes de acusar uma regressão
+RUIDO_MS = 0.5      # diferenças menores que isso são ruído de medição
+PAGINAS = (1, 10, 50)
+PAGINA_PDF = re.compile(rb"/Type /Page\b")
+
+def _caso_ler_pdf(paginas):
+    from benchmarks.sinteticos import pdf_laudo
+    from pei.laudo import cache_laudos, ler_pdf
+    conteudo = pdf_laudo(paginas)
+    def executar():
+        cache_laudos.memoria.limpar()
+        return ler_pdf(conteudo)
+    return executar, lambda texto: f"{len(texto)} caracteres"
+
+def _caso_limpeza(paginas):
+    from benchmarks.sinteticos import relatorio_markdown
+    from pei.documento import limpar_texto_pdf
+    texto = relatorio_markdown(paginas)
+    return (lambda: limpar_texto_pdf(texto)), lambda limpo: f"{len(texto)} -> {len(limpo)} caracteres"
+
+def _caso_prompt(paginas_laudo):
+    # Cliente trocado por uma resposta fixa: mede montagem do prompt, condensação do laudo e cache
+    import pei.ia as ia
+    from benchmarks.sinteticos import dados_estudante, texto_laudo
+    from pei.condensacao import _cache_condensados, _cache_trechos
+    dados = dados_estudante(); dados['ia_sugestao'] = ''
+    laudo = "\n\n".join(texto_laudo(paginas_laudo))
+    mensagens = []
+    def resposta_falsa(api_key, **kwargs):
+        mensagens[:] = kwargs["messages"]
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content="Parecer."))])
+    def executar():
+        _cache_condensados.limpar(); _cache_trechos.limpar()
+        original, ia.criar_resposta = ia.criar_resposta, resposta_falsa
+        try: return ia.consultar_gpt("sk-benchmark", dados, laudo, regenerar=True)
+        finally: ia.criar_resposta = original
+    return executar, lambda r: f"prompt com {sum(len(m['content']) for m in mensagens)} caracteres"
+
+def _caso_secoes(paginas_laudo):
+    # Mesma resposta fixa, agora com as quatro seções em paralelo (sem cache: regenerar=True)
+    import pei.ia as ia
+    from benchmarks.sinteticos import dados_estudante, texto_laudo
+    from pei.condensacao import _cache_condensados, _cache_trechos
+    dados = dados_estudante(); dados['ia_sugestao'] = ''
+    laudo = "\n\n".join(texto_laudo(paginas_laudo))
+    # Seções vêm em stream: um pedaço de texto e o de uso
+    pedacos = [SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content="Parecer."))]),
+               SimpleNamespace(usage=None, choices=[])]
+    def executar():
+        _cache_condensados.limpar(); _cache_trechos.limpar()
+        original, ia.criar_resposta = ia.criar_resposta, lambda api_key, **kwargs: iter(pedacos)
+        try: return ia.consultar_gpt_secoes("sk-benchmark", dados, laudo, regenerar=True)
+        finally: ia.criar_resposta = original
+    return executar, lambda r: f"{len(ia.SECOES)} seções, {len(r[0])} caracteres"
+
+def _caso_pdf(paginas):
+    from benchmarks.sinteticos import dados_estudante
+    from pei.documento import gerar_pdf
+    dados = dados_estudante(paginas)
+    return (lambda: gerar_pdf(dados, True)), lambda pdf: f"{len(PAGINA_PDF.findall(pdf))} páginas"
+
+def _caso_docx(paginas):
+    from benchmarks.sinteticos import dados_estudante
+    from pei.documento import gerar_docx
+    dados = dados_estudante(paginas)
+    return (lambda: gerar_docx(dados)), lambda docx: f"{len(docx.getvalue()) // 1024} KB"
+
+def _caso_bncc(serie):
+    # Índice já carregado (uma vez por processo): mede só a pontuação das habilidades da série
+    from benchmarks.sinteticos import dados_estudante
+    from pei.bncc import candidatas, indice
+    dados = dados_estudante(); dados['serie'] = serie
+    indice()
+    return (lambda: candidatas(dados)), lambda r: ", ".join(h['codigo'] for h in r)
+
+CASOS = {
+    **{f"ler_pdf.{p}pag": (_caso_ler_pdf, p) for p in PAGINAS},
+    **{f"limpar_texto_pdf.{p}pag": (_caso_limpeza, p) for p in (10, 50)},
+    **{f"consultar_gpt.laudo_{p}pag": (_caso_prompt, p) for p in (1, 10)},
+    **{f"consultar_gpt_secoes.laudo_{p}pag": (_caso_secoes, p) for p in (1, 10)},
+    "bncc.candidatas": (_caso_bncc, "3º Ano"),
+    **{f"gerar_pdf.{p}pag": (_caso_pdf, p) for p in PAGINAS},
+    **{f"gerar_docx.{p}pag": (_caso_docx, p) for p in PAGINAS},
+}
+
+def referencia():
+    # Carga fixa de CPU medida em toda execução: compensa máquinas mais lentas/rápidas que a da linha de base
+    def carga():
+        texto = " ".join(str(i * 7919 % 10007) for i in range(20000))
+        return sorted(json.loads(json.dumps(texto.split())))
+    tempos = []
+    for _ in range(5):
+        inicio = time.perf_counter(); carga(); tempos.append((time.perf_counter() - inicio) * 1000)
+    return round(min(tempos), 3)
+
+def medir_caso(nome, repeticoes):
+    fabrica, parametro = CASOS[nome]
+    executar, descrever = fabrica(parametro)
+    resultado = executar()  # aquecimento: imports, pool de processos, logo reduzido
+    ref = referencia()  # medida junto do caso: a velocidade da máquina oscila durante a execução
+    tempos = []
+    for _ in range(repeticoes):
+        # Como o timeit: coleta antes e GC desligado durante a medição
+        gc.collect(); gc.disable()
+        try:
+            inicio = time.perf_counter()
+            executar()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        finally: gc.enable()
+    tempos.sort()
+    return {
+        "mediana_ms": round(statistics.median(tempos), 3),
+        "min_ms": round(tempos[0], 3),
+        "max_ms": round(tempos[-1], 3),
+        "referencia_ms": ref,
+        "repeticoes": repeticoes,
+        "detalhe": descrever(resultado),
+    }
+
+def escala(atual, base):
+    # Razão entre a referência de CPU agora e na gravação da linha de base
+    return atual["referencia_ms"] / base["referencia_ms"] if base.get("referencia_ms") else 1.0
+
+def comparar(atual, base, limite=LIMITE):
+    # Devolve (situação, variação relativa) de um caso frente à linha de base, já descontada a escala
+    if base is None: return "novo", None
+    a, b = atual[CRITERIO], base[CRITERIO] * escala(atual, base)
+    variacao = a / b - 1 if b else 0.0
+    if variacao > limite and a - b > RUIDO_MS: return "REGRESSÃO", variacao
+    if variacao < -limite and b - a > RUIDO_MS: return "melhora", variacao
+    return "ok", variacao
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do PEI 360º")
+    parser.add_argument("-f", "--filtro", default="", help="só casos cujo nome contém este texto")
+    parser.add_argument("-r", "--repeticoes", type=int, default=9)
+    parser.add_argument("--limite", type=float, default=LIMITE, help="regressão tolerada (0.5 = 50%%)")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--gravar", action="store_true", help="grava os resultados como nova linha de base")
+    args = parser.parse_args(argv)
+
+    base = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f: base = json.load(f).get("casos", {})
+
+    resultados, regressoes = {}, []
+    print(f"{'caso (ms)':32} {'mediana':>10} {'mínimo':>10} {'base':>10} {'var':>8}  situação")
+    for nome in CASOS:
+        if args.filtro not in nome: continue
+        if args.gravar:
+            # Linha de base: a do meio de três medições, para não gravar um instante atípico da máquina
+            atual = sorted((medir_caso(nome, args.repeticoes) for _ in range(3)), key=lambda r: r[CRITERIO])[1]
+        else: atual = medir_caso(nome, args.repeticoes)
+        situacao, variacao = comparar(atual, base.get(nome), args.limite)
+        for _ in range(CONFIRMACOES):
+            # Regressão só conta se persistir ao medir de novo
+            if situacao != "REGRESSÃO": break
+            novo = medir_caso(nome, args.repeticoes)
+            if novo[CRITERIO] < atual[CRITERIO]: atual = novo
+            situacao, variacao = comparar(atual, base.get(nome), args.limite)
+        resultados[nome] = atual
+        if situacao == "REGRESSÃO": regressoes.append(nome)
+        base_ms = f"{base[nome][CRITERIO] * escala(atual, base[nome]):.1f}" if nome in base else "-"
+        var = f"{variacao:+.0%}" if variacao is not None else "-"
+        print(f"{nome:32} {atual['mediana_ms']:>10.1f} {atual[CRITERIO]:>10.1f} {base_ms:>10} {var:>8}  {situacao} ({atual['detalhe']})", flush=True)
+
+    if args.gravar:
+        gravados = {**base, **resultados}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"maquina": {"python": platform.python_version(), "sistema": platform.platform(), "cpus": os.cpu_count()},
+                       "casos": gravados}, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"Linha de base gravada em {args.baseline}")
+        return 0
+    if regressoes:
+        print(f"{len(regressoes)} regressão(ões) acima de {args.limite:.0%}: {', '.join(regressoes)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
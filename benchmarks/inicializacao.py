@@ -0,0 +1,51 @@
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# --- CUSTO DE INICIALIZAÇÃO (COLD START) ---
+# Mede, num interpretador novo a cada rodada, quanto custam os imports de nível de módulo de cada app
+# além do próprio streamlit (que o servidor já carregou antes de executar o script).
+# Uso: python -m benchmarks.inicializacao [app.py app_ai.py] [-r 7]
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PESADOS = ("openai", "httpx", "pypdf", "fpdf", "docx", "lxml", "PIL")
+
+MEDIR = """
+import json, sys, time
+import streamlit
+inicio = time.perf_counter()
+{imports}
+ms = (time.perf_counter() - inicio) * 1000
+print(json.dumps({{"ms": ms, "pesados": sorted(m for m in {pesados!r} if m in sys.modules)}}))
+"""
+
+def imports_do_app(caminho):
+    # Só os imports de nível de módulo (os que rodam antes do primeiro st.* do script)
+    with open(caminho, encoding="utf-8") as f: arvore = ast.parse(f.read())
+    linhas = [ast.unparse(no) for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom))]
+    return [l for l in linhas if l != "import streamlit as st"]
+
+def medir(caminho, rodadas):
+    codigo = MEDIR.format(imports="\n".join(imports_do_app(caminho)), pesados=PESADOS)
+    amostras = []
+    for _ in range(rodadas):
+        saida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+        amostras.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+    tempos = sorted(a["ms"] for a in amostras)
+    return {"mediana_ms": round(statistics.median(tempos), 1), "min_ms": round(tempos[0], 1), "pesados": amostras[-1]["pesados"]}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Custo de import dos apps do PEI 360º")
+    parser.add_argument("apps", nargs="*", default=["app.py", "app_ai.py"])
+    parser.add_argument("-r", "--rodadas", type=int, default=7)
+    args = parser.parse_args(argv)
+    for app in args.apps:
+        r = medir(os.path.join(RAIZ, app), args.rodadas)
+        print(f"{app:12} mediana {r['mediana_ms']:7.1f} ms  mínimo {r['min_ms']:7.1f} ms  carregados: {', '.join(r['pesados']) or '-'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
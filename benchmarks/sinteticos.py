@@ -0,0 +1,69 @@
+import random
+from datetime import date
+from pei.dados import dados_vazios
+
+# --- DADOS SINTÉTICOS (DETERMINÍSTICOS) ---
+# Mesma semente = mesmos documentos em qualquer máquina: as medições são comparáveis.
+SEMENTE = 360
+LINHAS_POR_PAGINA = 40  # linhas de texto por página do laudo
+LINHAS_RELATORIO_POR_PAGINA = 39  # linhas do markdown (com as em branco) por página do PDF_V3
+
+FRASES_LAUDO = [
+    "Paciente apresenta hipótese diagnóstica de Transtorno do Espectro Autista, nível 1 de suporte.",
+    "Observa-se desatenção sustentada e impulsividade em atividades com demanda executiva.",
+    "Recomenda-se acompanhamento fonoaudiológico semanal e terapia ocupacional com foco sensorial.",
+    "Em uso de metilfenidato 10 mg pela manhã, com boa tolerância e redução da agitação motora.",
+    "Avaliação neuropsicológica indica QI dentro da média, com memória de trabalho rebaixada.",
+    "Família relata hipersensibilidade auditiva em ambientes ruidosos e rigidez na rotina.",
+    "Endereço da clínica: Rua das Flores, 123, sala 45, telefone (11) 5555-0000.",
+    "Conclusão: o estudante se beneficia de antecipação de rotina, pistas visuais e tempo estendido.",
+]
+
+PARAGRAFOS_RELATORIO = [
+    "O estudante demonstra **interesse intenso** por dinossauros e *Minecraft*, o que pode ser usado como porta de entrada para conteúdos de Ciências e Matemática.",
+    "A medicação em uso pode causar redução de apetite e sonolência no fim da manhã; recomenda-se atenção a atividades exigentes após o intervalo.",
+    "Habilidade BNCC (EF03MA01): ler, escrever e comparar números naturais até a ordem de unidade de milhar, com apoio de material concreto.",
+    "As avaliações devem priorizar “enunciados curtos”, consulta permitida e formato oral quando houver sobrecarga sensorial — sempre com __tempo estendido__.",
+    "Parecer: o plano deve ser revisto bimestralmente com a família e a rede de apoio 🙂.",
+]
+
+def texto_laudo(paginas, rng=None):
+    rng = rng or random.Random(SEMENTE)
+    return ["\n".join(rng.choice(FRASES_LAUDO) for _ in range(LINHAS_POR_PAGINA // 2)) for _ in range(paginas)]
+
+def pdf_laudo(paginas, semente=SEMENTE):
+    # Laudo em PDF com texto extraível, `paginas` páginas
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_font("Arial", size=10)
+    for texto in texto_laudo(paginas, random.Random(semente)):
+        pdf.add_page()
+        pdf.multi_cell(0, 5, texto)
+    return pdf.output(dest='S').encode('latin-1', 'replace')
+
+def relatorio_markdown(paginas, rng=None):
+    # Parecer no formato devolvido pela IA (títulos, listas, negrito), ~`paginas` páginas no PDF
+    rng = rng or random.Random(SEMENTE)
+    linhas, secao = [], 0
+    while len(linhas) < paginas * LINHAS_RELATORIO_POR_PAGINA:
+        if len(linhas) % 24 == 0:
+            secao += 1
+            linhas.append(f"## {secao}. {rng.choice(['PERFIL', 'BNCC', 'ESTRATÉGIAS', 'CONCLUSÃO'])}")
+        paragrafo = rng.choice(PARAGRAFOS_RELATORIO)
+        linhas.append(f"* {paragrafo}" if rng.random() < 0.4 else paragrafo)
+        linhas.append("")
+    return "\n".join(linhas)
+
+def dados_estudante(paginas=1):
+    dados = dados_vazios()
+    dados.update(
+        nome="Estudante Sintético", nasc=date(2015, 3, 14), serie="3º Ano", turma="B",
+        diagnostico="TEA nível 1; TDAH", medicacao="Metilfenidato 10 mg",
+        historico="Sem retenções; dificuldade de leitura desde o 1º ano.", familia="Mora com a mãe e a avó.",
+        hiperfoco="Dinossauros", potencias=["Memória Visual", "Tecnologia"],
+        rede_apoio=["Fonoaudiólogo", "Terapeuta Ocupacional"], orientacoes_especialistas="Antecipar mudanças de rotina.",
+        b_sensorial=["Hipersensibilidade Auditiva"], b_cognitiva=["Atenção", "Memória"], b_social=["Frustração"],
+        estrategias_acesso=["Tempo Estendido (+25%)"], estrategias_ensino=["Pistas Visuais"], estrategias_avaliacao=["Prova Adaptada"],
+        ia_sugestao=relatorio_markdown(paginas),
+    )
+    return dados
@@ -0,0 +1,99 @@
+import argparse
+import json
+import sys
+
+# --- TOKENS DE ENTRADA DO PROMPT ---
+# Conta os tokens das mensagens enviadas em cada geração (relatório inteiro e cada seção) e quanto
+# delas é prefixo idêntico a um pedido anterior: entre estudantes diferentes (outro laudo) e para o
+# mesmo estudante depois de editar uma barreira. É esse trecho que o cache automático de prefixo da
+# OpenAI reaproveita (a partir de 1024 tokens, em blocos de 128).
+# Uso: python -m benchmarks.tokens [--paginas-laudo 3] [--json saida.json]
+# Com tiktoken instalado a contagem é exata (o200k_base, do gpt-4o); sem ele, estimada (4 caracteres/token).
+MINIMO_CACHE = 1024
+BLOCO_CACHE = 128
+
+def em_cache(prefixo):
+    # Tokens que a OpenAI cobraria como cached_tokens, dado o tamanho do prefixo repetido
+    return prefixo // BLOCO_CACHE * BLOCO_CACHE if prefixo >= MINIMO_CACHE else 0
+
+def contador():
+    try:
+        import tiktoken
+        codificacao = tiktoken.get_encoding("o200k_base")
+        return (lambda texto: len(codificacao.encode(texto))), "tiktoken o200k_base"
+    except Exception:  # sem o pacote, ou sem rede para baixar a codificação
+        return (lambda texto: (len(texto) + 3) // 4), "estimativa 4 caracteres/token"
+
+COLUNAS = ("tokens_completo", "tokens_esparso", "prefixo_outro_estudante", "prefixo_apos_edicao", "sem_cache_apos_edicao")
+
+def _texto(mensagens):
+    # Ordem em que o provedor vê o pedido: papel + conteúdo de cada mensagem
+    return "".join(f"{m['role']}\n{m['content']}\n" for m in mensagens)
+
+def _prefixo_comum(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y: break
+        n += 1
+    return a[:n]
+
+def estudantes(paginas_laudo):
+    # (dados, laudo) de cada cenário
+    import random
+    from benchmarks.sinteticos import SEMENTE, dados_estudante, texto_laudo
+    from pei.dados import dados_vazios
+    def laudo(semente): return "\n\n".join(texto_laudo(paginas_laudo, random.Random(semente))) if paginas_laudo else ""
+    completo = dados_estudante()
+    editado = dados_estudante(); editado['b_social'] = ["Frustração", "Isolamento"]
+    outro = dados_estudante()
+    outro.update(nome="Outra Estudante", serie="Fund. II", diagnostico="Dislexia", hiperfoco="Música",
+                 potencias=["Oralidade"], b_cognitiva=["Processamento Lento"], estrategias_ensino=["Fragmentação de Tarefas"])
+    esparso = dados_vazios()
+    esparso.update(nome="Estudante Novo", serie="1º Ano", diagnostico="Em investigação")
+    return {"completo": (completo, laudo(SEMENTE)), "editado": (editado, laudo(SEMENTE)),
+            "outro": (outro, laudo(SEMENTE + 1)), "esparso": (esparso, laudo(SEMENTE + 2))}
+
+def medir(paginas_laudo=3):
+    from pei.ia import SECOES, laudo_secao, montar_mensagens, montar_mensagens_secao
+    contar, metodo = contador()
+    alunos = estudantes(paginas_laudo)
+
+    def pedidos(dados, laudo):
+        return {"relatorio": montar_mensagens(dados, laudo),
+                **{titulo: montar_mensagens_secao(s, dados, laudo_secao(s, dados, laudo)) for s in SECOES for titulo in s[:1]}}
+
+    por_aluno = {nome: {p: _texto(m) for p, m in pedidos(*aluno).items()} for nome, aluno in alunos.items()}
+    resultado = {"metodo": metodo, "paginas_laudo": paginas_laudo, "pedidos": {}}
+    for pedido in por_aluno["completo"]:
+        textos = {nome: t[pedido] for nome, t in por_aluno.items()}
+        resultado["pedidos"][pedido] = {
+            "tokens_completo": contar(textos["completo"]),
+            "tokens_esparso": contar(textos["esparso"]),
+            "prefixo_outro_estudante": contar(_prefixo_comum(textos["completo"], textos["outro"])),
+            "prefixo_apos_edicao": contar(_prefixo_comum(textos["completo"], textos["editado"])),
+            "sem_cache_apos_edicao": contar(textos["editado"]) - em_cache(contar(_prefixo_comum(textos["completo"], textos["editado"]))),
+            "espacos": sum(textos["completo"].count(s) for s in ("  ", "\n\n")),
+        }
+    # Uma geração por seções envia os quatro pedidos: soma como custo de entrada total
+    secoes = [p for p in resultado["pedidos"] if p != "relatorio"]
+    resultado["secoes_total"] = {k: sum(resultado["pedidos"][p][k] for p in secoes) for k in COLUNAS}
+    return resultado
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tokens de entrada por pedido de geração")
+    parser.add_argument("--paginas-laudo", type=int, default=3, help="0 = sem laudo")
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args(argv)
+    r = medir(args.paginas_laudo)
+    print(f"contagem: {r['metodo']} | laudo sintético de {r['paginas_laudo']} páginas | cache de prefixo a partir de {MINIMO_CACHE} tokens")
+    print(f"{'pedido':16} {'completo':>9} {'esparso':>9} {'prefixo:':>9} {'prefixo:':>9} {'sem cache':>9} {'espaços':>8}")
+    print(f"{'':16} {'':>9} {'':>9} {'outro':>9} {'edição':>9} {'(edição)':>9}")
+    for pedido, p in r["pedidos"].items():
+        print(f"{pedido:16} " + " ".join(f"{p[c]:>9}" for c in COLUNAS) + f" {p['espacos']:>8}")
+    print(f"{'seções (soma)':16} " + " ".join(f"{r['secoes_total'][c]:>9}" for c in COLUNAS))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(r, f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
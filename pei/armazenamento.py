@@ -0,0 +1,153 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from functools import lru_cache
+from pei.dados import _data, dados_vazios
+
+# --- ARMAZENAMENTO DOS ESTUDANTES (SQLITE) ---
+# Cada campo de `dados` é uma linha em `campos`: o autosave grava só o que mudou.
+# nome/série/turma ficam também em `estudantes`, indexados para busca e listagem.
+CAMINHO_PADRAO = os.path.join(".pei_dados", "pei.sqlite")
+CAMPO_LAUDO = "pdf_text"
+ESPERA_AUTOSAVE = 1.5
+
+def _codificar(valor):
+    if isinstance(valor, date): return json.dumps(valor.isoformat())
+    return json.dumps(valor, ensure_ascii=False, default=str)
+
+def _decodificar(campo, texto):
+    valor = json.loads(texto)
+    return _data(valor) if campo == 'nasc' else valor
+
+class Armazenamento:
+    def __init__(self, caminho=None):
+        self.caminho = caminho or os.environ.get("PEI_BANCO", CAMINHO_PADRAO)
+        pasta = os.path.dirname(self.caminho)
+        if pasta: os.makedirs(pasta, exist_ok=True)
+        self._local = threading.local()
+        with self._conexao() as con:
+            con.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS estudantes (
+                    id INTEGER PRIMARY KEY, nome TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+                    serie TEXT, turma TEXT NOT NULL DEFAULT '', criado REAL NOT NULL, atualizado REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS idx_estudantes_nome ON estudantes (nome);
+                CREATE INDEX IF NOT EXISTS idx_estudantes_serie_turma ON estudantes (serie, turma);
+                CREATE INDEX IF NOT EXISTS idx_estudantes_turma ON estudantes (turma);
+                CREATE TABLE IF NOT EXISTS campos (
+                    estudante_id INTEGER NOT NULL REFERENCES estudantes (id) ON DELETE CASCADE,
+                    campo TEXT NOT NULL, valor TEXT NOT NULL,
+                    PRIMARY KEY (estudante_id, campo)) WITHOUT ROWID;
+            """)
+
+    def _conexao(self):
+        # Uma conexão por thread (sessões do Streamlit e o timer do autosave)
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=10)
+            con.execute("PRAGMA foreign_keys=ON")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def criar(self, dados, laudo=""):
+        agora = time.time()
+        with self._conexao() as con:
+            cur = con.execute("INSERT INTO estudantes (nome, serie, turma, criado, atualizado) VALUES (?, ?, ?, ?, ?)",
+                              (dados.get('nome') or '', dados.get('serie'), dados.get('turma') or '', agora, agora))
+            estudante_id = cur.lastrowid
+            campos = dict(dados); campos[CAMPO_LAUDO] = laudo or ""
+            con.executemany("INSERT INTO campos VALUES (?, ?, ?)", [(estudante_id, c, _codificar(v)) for c, v in campos.items()])
+        return estudante_id
+
+    def salvar_campos(self, estudante_id, alterados):
+        if not alterados: return
+        with self._conexao() as con:
+            con.executemany("INSERT OR REPLACE INTO campos VALUES (?, ?, ?)",
+                            [(estudante_id, c, _codificar(v)) for c, v in alterados.items()])
+            indexados = {c: alterados[c] for c in ('nome', 'serie', 'turma') if c in alterados}
+            sets = "".join(f", {c} = ?" for c in indexados)
+            con.execute(f"UPDATE estudantes SET atualizado = ?{sets} WHERE id = ?",
+                        (time.time(), *[(v or '') if c != 'serie' else v for c, v in indexados.items()], estudante_id))
+
+    def carregar(self, estudante_id):
+        linhas = self._conexao().execute("SELECT campo, valor FROM campos WHERE estudante_id = ?", (estudante_id,)).fetchall()
+        if not linhas: return None, ""
+        dados = dados_vazios()
+        laudo = ""
+        for campo, texto in linhas:
+            if campo == CAMPO_LAUDO: laudo = json.loads(texto)
+            else: dados[campo] = _decodificar(campo, texto)
+        return dados, laudo
+
+    def listar(self, nome="", serie=None, turma=None, limite=50):
+        filtros, params = [], []
+        if nome: filtros.append("nome LIKE ?"); params.append(nome.strip().replace("%", "").replace("_", "") + "%")
+        # None = sem filtro; "" = registros sem série/turma
+        if serie is not None: filtros.append("serie IS ?"); params.append(serie or None)
+        if turma is not None: filtros.append("turma = ?"); params.append(turma)
+        where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+        sql = f"SELECT id, nome, serie, turma, atualizado FROM estudantes {where} ORDER BY nome LIMIT ?"
+        colunas = ("id", "nome", "serie", "turma", "atualizado")
+        return [dict(zip(colunas, linha)) for linha in self._conexao().execute(sql, (*params, limite))]
+
+    def turmas(self):
+        sql = "SELECT serie, turma, COUNT(*) FROM estudantes GROUP BY serie, turma ORDER BY serie, turma"
+        return [{"serie": s, "turma": t, "total": n} for s, t, n in self._conexao().execute(sql)]
+
+    def remover(self, estudante_id):
+        with self._conexao() as con: con.execute("DELETE FROM estudantes WHERE id = ?", (estudante_id,))
+
+@lru_cache(maxsize=None)
+def obter_armazenamento(caminho=None):
+    return Armazenamento(caminho)
+
+class AutoSalvamento:
+    # Debounce: alterações se acumulam e são gravadas juntas após ESPERA_AUTOSAVE s sem novas mudanças
+    def __init__(self, armazenamento, estudante_id=None, espera=ESPERA_AUTOSAVE):
+        self.armazenamento = armazenamento
+        self.estudante_id = estudante_id
+        self.espera = espera
+        self._gravado = {}
+        self._pendente = {}
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def marcar_gravado(self, dados, laudo=""):
+        # Estado recém-carregado do banco: referência para detectar mudanças
+        with self._lock:
+            self._gravado = {c: _codificar(v) for c, v in dados.items()}
+            self._gravado[CAMPO_LAUDO] = _codificar(laudo or "")
+
+    def registrar(self, dados, laudo=""):
+        atuais = dict(dados); atuais[CAMPO_LAUDO] = laudo or ""
+        with self._lock:
+            referencia = {**self._gravado, **{c: _codificar(v) for c, v in self._pendente.items()}}
+            alterados = {c: v for c, v in atuais.items() if referencia.get(c) != _codificar(v)}
+            if not alterados: return False
+            self._pendente.update(alterados)
+            if self._timer is not None: self._timer.cancel()
+            self._timer = threading.Timer(self.espera, self.descarregar)
+            self._timer.daemon = True
+            self._timer.start()
+        return True
+
+    def descarregar(self):
+        with self._lock:
+            if self._timer is not None: self._timer.cancel(); self._timer = None
+            pendente, self._pendente = self._pendente, {}
+            if not pendente: return self.estudante_id
+            if self.estudante_id is None:
+                if not pendente.get('nome'):
+                    self._pendente = pendente  # só cria o registro quando houver nome
+                    return None
+                dados = dados_vazios()
+                dados.update({c: v for c, v in pendente.items() if c != CAMPO_LAUDO})
+                self.estudante_id = self.armazenamento.criar(dados, pendente.get(CAMPO_LAUDO, ""))
+            else:
+                self.armazenamento.salvar_campos(self.estudante_id, pendente)
+            self._gravado.update({c: _codificar(v) for c, v in pendente.items()})
+            return self.estudante_id
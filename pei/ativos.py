@@ -0,0 +1,69 @@
+import base64
+import os
+import tempfile
+from functools import lru_cache
+from io import BytesIO
+from pei.cache import diretorio_cache, hash_bytes
+
+# --- ATIVOS VISUAIS (LOGO) ---
+# Descoberta e redimensionamento do logo feitos uma vez por processo (e gravados no cache em disco).
+LOGOS = ["360.png", "360.jpg", "logo.png", "logo.jpg", "iconeaba.png"]
+ALTURA_CABECALHO_PX = 140  # card do cabeçalho: 70 px em telas 2x
+LARGURA_PDF_PX = 260       # 22 mm no PDF a ~300 dpi
+PASTAS = [".", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))]
+
+def encontrar_logo():
+    for pasta in PASTAS:
+        for nome in LOGOS:
+            caminho = os.path.join(pasta, nome)
+            if os.path.exists(caminho): return os.path.normpath(caminho)
+    return None
+
+def _reduzir(conteudo, largura=None, altura=None, fundo_branco=False):
+    # Sem Pillow, usa o arquivo original
+    try: from PIL import Image
+    except ImportError: return conteudo, None
+    img = Image.open(BytesIO(conteudo))
+    w, h = img.size
+    escala = min(largura / w if largura else 1, altura / h if altura else 1, 1)
+    if escala < 1: img = img.resize((max(1, round(w * escala)), max(1, round(h * escala))), Image.LANCZOS)
+    if fundo_branco:
+        # PDF: sem canal alfa o fpdf não precisa montar SMask a cada documento
+        base = Image.new("RGB", img.size, (255, 255, 255))
+        img = img.convert("RGBA"); base.paste(img, mask=img.split()[3]); img = base
+    saida = BytesIO()
+    img.save(saida, format="PNG", optimize=True)
+    return saida.getvalue(), "image/png"
+
+def _variante(original, nome, **tamanho):
+    # Variantes reduzidas ficam no diretório de cache: um processo novo só lê o arquivo, sem carregar o Pillow
+    pasta = diretorio_cache() or os.path.join(tempfile.gettempdir(), "pei360")
+    os.makedirs(pasta, exist_ok=True)
+    medidas = "_".join(f"{k}{v}" for k, v in sorted(tamanho.items()))
+    caminho = os.path.join(pasta, f"logo_{nome}_{medidas}_{hash_bytes(original)[:16]}.png")
+    if not os.path.exists(caminho):
+        conteudo, mime = _reduzir(original, **tamanho)
+        if mime is None: return None
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, "wb") as f: f.write(conteudo)
+        os.replace(temporario, caminho)
+    return caminho
+
+@lru_cache(maxsize=1)
+def ativos():
+    logo = encontrar_logo()
+    registro = {"logo": logo, "logo_pdf": None, "cabecalho": b"", "cabecalho_b64": "", "cabecalho_mime": ""}
+    if not logo: return registro
+    with open(logo, "rb") as f: original = f.read()
+    cabecalho, mime = original, "image/png" if logo.endswith("png") else "image/jpeg"
+    registro["logo_pdf"] = logo
+    try:
+        reduzido = _variante(original, "cabecalho", altura=ALTURA_CABECALHO_PX)
+        if reduzido:
+            with open(reduzido, "rb") as f: cabecalho, mime = f.read(), "image/png"
+        registro["logo_pdf"] = _variante(original, "pdf", largura=LARGURA_PDF_PX, fundo_branco=True) or logo
+    except (OSError, ValueError): pass
+    registro["cabecalho"] = cabecalho
+    registro["cabecalho_b64"] = base64.b64encode(cabecalho).decode()
+    registro["cabecalho_mime"] = mime
+    return registro
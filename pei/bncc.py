@@ -0,0 +1,80 @@
+import heapq
+import json
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from pei.condensacao import termos
+
+# --- ÍNDICE BNCC (OFFLINE) ---
+# Habilidades reais da BNCC num JSON que acompanha o código, carregado uma vez por processo.
+# Em vez de a IA inventar uma habilidade (e um código que não existe), o prompt recebe as K
+# candidatas mais próximas do perfil: série pelo código, potencialidades e barreiras pelas descrições.
+ARQUIVO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bncc.json")
+K_CANDIDATAS = 3
+PESO_HIPERFOCO = 0.5
+PESO_COMPONENTE = 0.5  # desempate a favor das habilidades essenciais de LP e Matemática
+COMPONENTES_ESSENCIAIS = ("Língua Portuguesa", "Matemática")
+CODIGO = re.compile(r"^(EI|EF|EM)(\d)(\d)")
+
+# Opção do formulário -> termos que costumam aparecer nas habilidades ligadas a ela
+TEMAS = {
+    "Memória Visual": "ilustrações desenhos imagens recursos gráficos representar",
+    "Lógica Matemática": "números problemas cálculo quantidades ordenar comparar",
+    "Criatividade": "criar criando produções expressão imaginação",
+    "Oralidade": "oral fala expressar comunicar escuta intercâmbio",
+    "Tecnologia": "tecnologias digitais calculadora mídias vídeo",
+    "Artes": "artística desenho pintura colagem escultura",
+    "Música": "música musical sons instrumentos",
+    "Busca Sensorial": "corpo movimentos gestos sensações manipulável",
+    "Baixo Tônus": "corpo manuais coordenar controle",
+    "Atenção": "atenção escutar localizar",
+    "Memória": "memorização sequência",
+    "Rigidez Mental": "estratégias diferentes variadas hipóteses",
+    "Processamento Lento": "localizar informações explícitas palavras",
+    "Interação": "interações relações interpessoais cooperação colegas",
+    "Frustração": "sentimentos emoções conflitos confiança conquistas limitações",
+    "Regras": "regras jogos respeito",
+    "Isolamento": "participação grupos comunicar colegas",
+}
+
+def series_do_codigo(codigo):
+    # EI03.. -> Infantil; EF01 -> 1º Ano; EF35 -> 3º a 5º Ano; EF69 -> Fund. II; EM13.. -> Ensino Médio
+    m = CODIGO.match(codigo)
+    if not m: return set()
+    etapa, a, b = m.group(1), int(m.group(2)), int(m.group(3))
+    if etapa == "EI": return {"Infantil"}
+    if etapa == "EM": return {"Ensino Médio"}
+    anos = range(b, b + 1) if a == 0 else range(a, b + 1)
+    return {f"{ano}º Ano" if ano <= 5 else "Fund. II" for ano in anos}
+
+@lru_cache(maxsize=1)
+def indice():
+    # série -> [(habilidade, radicais da descrição)], na ordem do arquivo
+    with open(ARQUIVO, encoding="utf-8") as f: habilidades = json.load(f)["habilidades"]
+    por_serie = {}
+    for h in habilidades:
+        radicais = frozenset(termos(h["descricao"]))
+        for serie in series_do_codigo(h["codigo"]): por_serie.setdefault(serie, []).append((h, radicais))
+    return por_serie
+
+def _consulta(dados):
+    pesos = Counter()
+    for chave in ('potencias', 'b_sensorial', 'b_cognitiva', 'b_social'):
+        for opcao in dados.get(chave) or []:
+            for termo in set(termos(TEMAS.get(opcao, opcao))): pesos[termo] += 1.0
+    for termo in set(termos(dados.get('hiperfoco') or "")): pesos[termo] += PESO_HIPERFOCO
+    return pesos
+
+def candidatas(dados, k=K_CANDIDATAS):
+    # As k habilidades da série com mais termos em comum com o perfil (empate: ordem do arquivo)
+    opcoes = indice().get(dados.get('serie')) or []
+    pesos = _consulta(dados)
+    def nota(item):
+        i, (h, radicais) = item
+        essencial = PESO_COMPONENTE if h["componente"] in COMPONENTES_ESSENCIAIS else 0
+        return (sum(pesos[r] for r in radicais if r in pesos) + essencial, -i)
+    return [h for _, (h, _) in heapq.nlargest(k, enumerate(opcoes), key=nota)]
+
+def formatar(habilidade):
+    return f"{habilidade['codigo']} ({habilidade['componente']}): {habilidade['descricao']}"
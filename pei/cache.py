@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# --- CACHE EM CAMADAS (MEMÓRIA + DISCO) ---
+def hash_bytes(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()
+
+def chave_canonica(*partes, ordenar_listas=True):
+    # Mesmo conteúdo => mesma chave, independente da ordem das chaves (e das listas, se ordenar_listas)
+    def _normalizar(v):
+        if isinstance(v, dict): return {str(k): _normalizar(x) for k, x in v.items()}
+        if isinstance(v, set) or (ordenar_listas and isinstance(v, (list, tuple))): return sorted((_normalizar(x) for x in v), key=repr)
+        if isinstance(v, (list, tuple)): return [_normalizar(x) for x in v]
+        if isinstance(v, str): return v.strip()
+        if v is None or isinstance(v, (int, float, bool)): return v
+        return str(v)
+    texto = json.dumps([_normalizar(p) for p in partes], sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+def _tamanho(valor):
+    if isinstance(valor, (bytes, bytearray)): return len(valor)
+    if isinstance(valor, str): return len(valor.encode('utf-8'))
+    return sys.getsizeof(valor)
+
+class CacheLRU:
+    # Cache do processo: compartilhado entre reruns e sessões do Streamlit.
+    def __init__(self, max_itens=256, max_bytes=64 * 1024 * 1024, ttl=None):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None: return None
+            valor, tamanho, criado = item
+            if self.ttl is not None and time.time() - criado > self.ttl:
+                del self._itens[chave]; self._bytes -= tamanho
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def guardar(self, chave, valor):
+        tamanho = _tamanho(valor)
+        if tamanho > self.max_bytes: return
+        with self._lock:
+            antigo = self._itens.pop(chave, None)
+            if antigo: self._bytes -= antigo[1]
+            self._itens[chave] = (valor, tamanho, time.time())
+            self._bytes += tamanho
+            while len(self._itens) > self.max_itens or self._bytes > self.max_bytes:
+                _, (_, t, _) = self._itens.popitem(last=False)
+                self._bytes -= t
+
+    def remover(self, chave):
+        with self._lock:
+            item = self._itens.pop(chave, None)
+            if item: self._bytes -= item[1]
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear(); self._bytes = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+class CacheSQLite:
+    # Camada em disco: sobrevive a reinícios do servidor. Falhas de disco nunca derrubam o app.
+    def __init__(self, caminho, max_bytes=256 * 1024 * 1024, ttl=None):
+        self.caminho = caminho
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        pasta = os.path.dirname(caminho)
+        if pasta: os.makedirs(pasta, exist_ok=True)
+        self._executar(self._criar_tabela)
+
+    def _criar_tabela(self, con):
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("""CREATE TABLE IF NOT EXISTS cache (
+            chave TEXT PRIMARY KEY, valor BLOB NOT NULL, tamanho INTEGER NOT NULL,
+            criado REAL NOT NULL, acessado REAL NOT NULL)""")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_cache_acessado ON cache (acessado)")
+
+    def _executar(self, funcao):
+        try:
+            con = sqlite3.connect(self.caminho, timeout=10)
+            try:
+                with con: return funcao(con)
+            finally: con.close()
+        except sqlite3.Error: return None
+
+    def obter(self, chave):
+        def _obter(con):
+            linha = con.execute("SELECT valor, criado FROM cache WHERE chave = ?", (chave,)).fetchone()
+            if linha is None: return None
+            agora = time.time()
+            if self.ttl is not None and agora - linha[1] > self.ttl:
+                con.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+                return None
+            con.execute("UPDATE cache SET acessado = ? WHERE chave = ?", (agora, chave))
+            return linha[0]
+        return self._executar(_obter)
+
+    def guardar(self, chave, valor):
+        tamanho = _tamanho(valor)
+        if tamanho > self.max_bytes: return
+        def _guardar(con):
+            agora = time.time()
+            con.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)", (chave, valor, tamanho, agora, agora))
+            if self.ttl is not None:
+                con.execute("DELETE FROM cache WHERE criado < ?", (agora - self.ttl,))
+            total = con.execute("SELECT COALESCE(SUM(tamanho), 0) FROM cache").fetchone()[0]
+            if total > self.max_bytes:
+                # Remove os menos acessados até voltar ao limite
+                excedente = total - self.max_bytes
+                for c, t in con.execute("SELECT chave, tamanho FROM cache ORDER BY acessado").fetchall():
+                    if excedente <= 0: break
+                    con.execute("DELETE FROM cache WHERE chave = ?", (c,)); excedente -= t
+        with self._lock: self._executar(_guardar)
+
+    def remover(self, chave):
+        self._executar(lambda con: con.execute("DELETE FROM cache WHERE chave = ?", (chave,)))
+
+    def limpar(self):
+        self._executar(lambda con: con.execute("DELETE FROM cache"))
+
+class CacheEmCamadas:
+    def __init__(self, memoria, disco=None):
+        self.memoria = memoria
+        self.disco = disco
+
+    def obter(self, chave):
+        valor = self.memoria.obter(chave)
+        if valor is None and self.disco is not None:
+            valor = self.disco.obter(chave)
+            if valor is not None: self.memoria.guardar(chave, valor)
+        return valor
+
+    def guardar(self, chave, valor):
+        self.memoria.guardar(chave, valor)
+        if self.disco is not None: self.disco.guardar(chave, valor)
+
+    def remover(self, chave):
+        self.memoria.remover(chave)
+        if self.disco is not None: self.disco.remover(chave)
+
+def diretorio_cache():
+    # PEI_CACHE_DIR="" desativa a camada em disco
+    return os.environ.get("PEI_CACHE_DIR", ".pei_cache")
@@ -0,0 +1,91 @@
+import os
+import random
+import sys
+import time
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
+# --- CLIENTE OPENAI COMPARTILHADO ---
+# O pacote openai (e o httpx) só é importado na primeira chamada à API, não na abertura do app.
+TIMEOUT_CONEXAO = float(os.environ.get("PEI_OPENAI_TIMEOUT_CONEXAO", 10))
+TIMEOUT_LEITURA = float(os.environ.get("PEI_OPENAI_TIMEOUT_LEITURA", 60))
+ORCAMENTO_TOTAL = float(os.environ.get("PEI_OPENAI_ORCAMENTO", 180))
+MAX_TENTATIVAS = int(os.environ.get("PEI_OPENAI_TENTATIVAS", 5))
+ESPERA_BASE = 1.0
+ESPERA_MAX = 30.0
+
+# --- PROVEDOR ---
+# "openai" (padrão) ou "simulado": servidor local compatível com a API (pei/simulado.py), sem rede nem custo.
+# O simulado passa pelo mesmo cliente, retentativas e timeouts: serve para medir o pipeline inteiro.
+PROVEDORES = ("openai", "simulado")
+PROVEDOR = os.environ.get("PEI_PROVEDOR", "openai").lower()
+if PROVEDOR not in PROVEDORES: raise ValueError(f"PEI_PROVEDOR deve ser um de {PROVEDORES}, não {PROVEDOR!r}")
+
+def url_provedor():
+    if os.environ.get("PEI_OPENAI_BASE_URL"): return os.environ["PEI_OPENAI_BASE_URL"]
+    if PROVEDOR == "simulado":
+        from pei.simulado import iniciar_servidor
+        return iniciar_servidor()
+    return None
+
+@lru_cache(maxsize=32)
+def obter_cliente(api_key, base_url=None):
+    # Um cliente por chave no processo: reaproveita o pool HTTP (keep-alive) entre sessões.
+    # As retentativas ficam em com_retentativas, para respeitar o orçamento total.
+    import openai
+    return openai.OpenAI(
+        api_key=api_key,
+        base_url=base_url or url_provedor(),
+        timeout=openai.Timeout(TIMEOUT_LEITURA, connect=TIMEOUT_CONEXAO),
+        max_retries=0
+    )
+
+def _retentavel(erro):
+    openai = sys.modules.get("openai")  # sem o pacote carregado, o erro não veio da API
+    if openai is None: return False
+    if isinstance(erro, openai.APIConnectionError): return True  # inclui APITimeoutError
+    if isinstance(erro, openai.APIStatusError): return erro.status_code == 429 or erro.status_code >= 500
+    return False
+
+def _retry_after(erro):
+    resposta = getattr(erro, "response", None)
+    if resposta is None: return None
+    cabecalhos = resposta.headers
+    try:
+        if cabecalhos.get("retry-after-ms"): return float(cabecalhos["retry-after-ms"]) / 1000
+        valor = cabecalhos.get("retry-after")
+        if not valor: return None
+        try: return max(0.0, float(valor))
+        except ValueError: return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError): return None
+
+def com_retentativas(funcao, orcamento=None, tentativas=None, dormir=time.sleep):
+    # `funcao(restante)` recebe os segundos que ainda restam do orçamento total
+    orcamento = ORCAMENTO_TOTAL if orcamento is None else orcamento
+    tentativas = MAX_TENTATIVAS if tentativas is None else tentativas
+    inicio = time.monotonic()
+    for tentativa in range(tentativas):
+        restante = orcamento - (time.monotonic() - inicio)
+        try: return funcao(restante)
+        except Exception as e:
+            if not _retentavel(e) or tentativa == tentativas - 1: raise
+            espera = _retry_after(e)
+            if espera is None: espera = random.uniform(0, min(ESPERA_MAX, ESPERA_BASE * 2 ** tentativa))
+            if espera >= orcamento - (time.monotonic() - inicio): raise
+            dormir(espera)
+
+def _timeout(restante):
+    import openai
+    return openai.Timeout(max(0.1, min(TIMEOUT_LEITURA, restante)), connect=min(TIMEOUT_CONEXAO, max(0.1, restante)))
+
+def criar_resposta(api_key, orcamento=None, **kwargs):
+    cliente = obter_cliente(api_key)
+    return com_retentativas(lambda restante: cliente.chat.completions.create(timeout=_timeout(restante), **kwargs), orcamento)
+
+def mensagem_erro(erro):
+    openai = sys.modules.get("openai")
+    if openai is None: return f"Erro OpenAI: {str(erro)}."
+    if isinstance(erro, openai.RateLimitError): return "⏳ Limite de uso da OpenAI atingido. Aguarde alguns instantes e tente novamente."
+    if isinstance(erro, openai.APITimeoutError): return "⏱️ A OpenAI não respondeu a tempo. Tente novamente."
+    if isinstance(erro, openai.AuthenticationError): return "🔑 Chave API OpenAI inválida."
+    return f"Erro OpenAI: {str(erro)}."
@@ -0,0 +1,120 @@
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from pei.cache import CacheLRU, chave_canonica, hash_bytes
+from pei.metricas import cronometrar
+
+# --- CONDENSAÇÃO DO LAUDO (BM25 LOCAL) ---
+# Em vez de cortar os primeiros 5000 caracteres (capa, cabeçalho, endereço...), o laudo é
+# dividido em trechos, pontuado contra os campos do estudante e os melhores trechos entram no prompt.
+ORCAMENTO_TOKENS = int(os.environ.get("PEI_LAUDO_TOKENS_PROMPT", 1500))
+CARACTERES_POR_TOKEN = 4
+TAMANHO_TRECHO = 700
+K1, B = 1.5, 0.75
+PESO_VOCABULARIO = 0.4  # termos clínicos fixos valem menos que os campos do próprio estudante
+
+STOPWORDS = frozenset("""
+a ao aos as com da das de do dos e em na nas no nos o os ou para pela pelas pelo pelos por que se sem
+sua suas seu seus um uma uns umas foi sao ser esta este isso essa esse ja mais muito como nao sim
+the and of to in
+""".split())
+
+# Vocabulário clínico pré-computado (radicais): marca onde costumam estar conclusões e condutas
+VOCABULARIO_CLINICO = (
+    "diagno", "hipote", "conclu", "parece", "cid", "transt", "defici", "espect", "autist", "tea",
+    "tdah", "hipera", "desate", "impuls", "dislex", "discal", "disgra", "intele", "superd", "altas",
+    "habili", "nivel", "suport", "recome", "orient", "encami", "condut", "interv", "terapi", "medica",
+    "metilf", "risper", "aripip", "sertra", "fluoxe", "dose", "neurop", "cognit", "atenca", "memori",
+    "funcoe", "execut", "lingua", "comuni", "social", "intera", "sensor", "compor", "aprend", "leitur",
+    "escrit", "matema", "escola", "pedago", "adapta", "avalia", "result", "escore", "percen", "qi",
+)
+
+_cache_condensados = CacheLRU(max_itens=256, max_bytes=8 * 1024 * 1024)
+_cache_trechos = CacheLRU(max_itens=32)  # laudo -> (trechos, radicais de cada um)
+
+def _sem_acento(texto):
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+
+def termos(texto):
+    # Radical = 6 primeiros caracteres: aproxima "atenção"/"atencional", "diagnóstico"/"diagnosticado"
+    palavras = re.findall(r"[a-z0-9]+", _sem_acento(texto.lower()))
+    return [p[:6] for p in palavras if p not in STOPWORDS and (len(p) > 2 or p.isdigit() or p in ("qi",))]
+
+def dividir_trechos(texto, tamanho=TAMANHO_TRECHO):
+    # Agrupa parágrafos/frases em trechos de ~`tamanho` caracteres, sem cortar frases
+    unidades = []
+    for paragrafo in re.split(r"\n\s*\n", texto):
+        paragrafo = re.sub(r"[ \t]*\n[ \t]*", " ", paragrafo).strip()
+        if not paragrafo: continue
+        if len(paragrafo) <= tamanho: unidades.append(paragrafo)
+        else: unidades.extend(f for f in re.split(r"(?<=[.;:!?])\s+", paragrafo) if f)
+    trechos, atual = [], ""
+    for unidade in unidades:
+        if atual and len(atual) + len(unidade) + 1 > tamanho:
+            trechos.append(atual); atual = ""
+        while len(unidade) > tamanho * 2:
+            trechos.append(unidade[:tamanho]); unidade = unidade[tamanho:]
+        atual = f"{atual} {unidade}".strip()
+    if atual: trechos.append(atual)
+    return trechos
+
+def consulta_estudante(dados):
+    campos = [dados.get('diagnostico') or "", dados.get('medicacao') or ""]
+    for chave in ('b_sensorial', 'b_cognitiva', 'b_social'): campos.extend(dados.get(chave) or [])
+    pesos = Counter()
+    for termo in termos(" ".join(campos)): pesos[termo] += 1.0
+    for termo in VOCABULARIO_CLINICO: pesos[termo] += PESO_VOCABULARIO
+    return pesos
+
+def trechos_indexados(texto):
+    # Divisão e radicais não dependem da consulta: cada seção que condensa o mesmo laudo reaproveita
+    chave = hash_bytes(texto.encode("utf-8"))
+    salvo = _cache_trechos.obter(chave)
+    if salvo is None:
+        trechos = dividir_trechos(texto)
+        salvo = (trechos, [Counter(termos(t)) for t in trechos])
+        _cache_trechos.guardar(chave, salvo)
+    return salvo
+
+def pontuar(trechos, consulta, tokens=None):
+    if tokens is None: tokens = [Counter(termos(t)) for t in trechos]
+    n = len(tokens)
+    media = sum(sum(c.values()) for c in tokens) / max(n, 1) or 1
+    df = Counter(t for c in tokens for t in c)
+    notas = []
+    for contagem in tokens:
+        tamanho = sum(contagem.values())
+        nota = 0.0
+        for termo, peso in consulta.items():
+            f = contagem.get(termo)
+            if not f: continue
+            idf = math.log(1 + (n - df[termo] + 0.5) / (df[termo] + 0.5))
+            nota += peso * idf * f * (K1 + 1) / (f + K1 * (1 - B + B * tamanho / media))
+        notas.append(nota)
+    return notas
+
+@cronometrar("laudo.condensacao")
+def condensar_laudo(texto, dados, orcamento_tokens=None):
+    orcamento = (ORCAMENTO_TOKENS if orcamento_tokens is None else orcamento_tokens) * CARACTERES_POR_TOKEN
+    if len(texto) <= orcamento: return texto
+    consulta = consulta_estudante(dados)
+    chave = chave_canonica(texto, dict(consulta), orcamento)
+    salvo = _cache_condensados.obter(chave)
+    if salvo is not None: return salvo
+    trechos, tokens = trechos_indexados(texto)
+    notas = pontuar(trechos, consulta, tokens)
+    escolhidos, usados = [], 0
+    for i in sorted(range(len(trechos)), key=lambda i: -notas[i]):
+        if usados + len(trechos[i]) + 7 > orcamento: continue
+        escolhidos.append(i); usados += len(trechos[i]) + 7
+    # Mantém a ordem original do laudo e marca os cortes
+    partes, anterior = [], -1
+    for i in sorted(escolhidos):
+        if i != anterior + 1: partes.append("[...]")
+        partes.append(trechos[i]); anterior = i
+    if anterior != len(trechos) - 1: partes.append("[...]")
+    condensado = "\n".join(partes)
+    _cache_condensados.guardar(chave, condensado)
+    return condensado
@@ -0,0 +1,45 @@
+import re
+from datetime import date, datetime
+
+# --- ESTRUTURA DO ESTUDANTE ---
+CAMPOS_LISTA = (
+    'potencias', 'rede_apoio', 'b_sensorial', 'b_cognitiva', 'b_social',
+    'estrategias_acesso', 'estrategias_ensino', 'estrategias_avaliacao',
+)
+
+def dados_vazios():
+    return {
+        'nome': '', 'nasc': None, 'serie': None, 'turma': '', 
+        'diagnostico': '', 'medicacao': '', 
+        'historico': '', 'familia': '', 'hiperfoco': '', 'potencias': [],
+        'rede_apoio': [], 'orientacoes_especialistas': '',
+        'b_sensorial': [], 'sup_sensorial': '🟡 Monitorado',
+        'b_cognitiva': [], 'sup_cognitiva': '🟡 Monitorado',
+        'b_social': [], 'sup_social': '🟡 Monitorado',
+        'estrategias_acesso': [], 'estrategias_ensino': [], 'estrategias_avaliacao': [],
+        'ia_sugestao': ''
+    }
+
+def _data(valor):
+    if not valor or isinstance(valor, date): return valor or None
+    for formato in ("%Y-%m-%d", "%d/%m/%Y"):
+        try: return datetime.strptime(str(valor).strip(), formato).date()
+        except ValueError: pass
+    return None
+
+def _lista(valor):
+    if not valor: return []
+    if isinstance(valor, (list, tuple)): return [str(v).strip() for v in valor if str(v).strip()]
+    return [v.strip() for v in re.split(r'[;|]', str(valor)) if v.strip()]
+
+def normalizar_dados(registro):
+    # Registro vindo de CSV/JSONL com as mesmas chaves de st.session_state.dados
+    dados = dados_vazios()
+    for chave in dados:
+        if chave not in registro or registro[chave] is None: continue
+        valor = registro[chave]
+        if chave in CAMPOS_LISTA: dados[chave] = _lista(valor)
+        elif chave == 'nasc': dados[chave] = _data(valor)
+        else: dados[chave] = str(valor).strip()
+    dados['serie'] = dados['serie'] or None
+    return dados
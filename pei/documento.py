@@ -0,0 +1,157 @@
+from io import BytesIO
+from pei.metricas import cronometrar
+from pei.relatorio import analisar_relatorio, texto_simples
+from xml.sax.saxutils import escape
+import codecs
+import re
+import unicodedata
+
+# --- UTILITÁRIOS ---
+# As fontes padrão do fpdf usam WinAnsiEncoding (cp1252): aspas curvas, travessões, marcadores e €
+# existem na fonte. O texto é codificado em cp1252 numa só passada (em C); o tratador de erro só é
+# chamado para o que não existe no cp1252, que é transliterado. Emojis e símbolos sem equivalente somem.
+MARCAS_MARKDOWN = (("**", ""), ("__", ""), ("### ", ""), ("## ", ""), ("# ", ""), ("* ", "• "))
+TRANSLITERACAO = {
+    "\u2010": "-", "\u2011": "-", "\u2012": "-", "\u2015": "-", "\u2212": "-",
+    "\u2032": "'", "\u2033": '"', "\u2039": "<", "\u203a": ">",
+    "\u2192": "->", "\u2190": "<-", "\u2194": "<->", "\u21d2": "=>", "\u2264": "<=", "\u2265": ">=", "\u2260": "!=", "\u2248": "~",
+    "\u2713": "v", "\u2714": "v", "\u2705": "v", "\u2717": "x", "\u2718": "x", "\u274c": "x",
+    "\u25cf": "•", "\u25aa": "•", "\u25e6": "•", "\u2023": "•", "\u2043": "•", "\u0131": "i",
+    "\u2009": " ", "\u200a": " ", "\u202f": " ", "\u2007": " ", "\u2003": " ", "\u2002": " ",
+}
+
+class _TabelaPDF(dict):
+    # Cada caractere sem equivalente no cp1252 é resolvido uma vez e fica guardado
+    def __missing__(self, c):
+        if c in TRANSLITERACAO: destino = TRANSLITERACAO[c]
+        else:
+            # Letras com diacríticos fora do cp1252 (ő, ş...) viram a letra base; controles C1 somem
+            destino = "".join(b for b in unicodedata.normalize("NFKD", c)
+                              if (ord(b) < 0x80 or 0xa0 <= ord(b) <= 0xff) and not unicodedata.combining(b))
+        self[c] = destino
+        return destino
+
+_tabela_pdf = _TabelaPDF()
+
+def _transliterar(erro):
+    trecho = erro.object[erro.start:erro.end]
+    return "".join(_tabela_pdf[c] for c in trecho), erro.end
+
+codecs.register_error("pei_pdf", _transliterar)
+
+def texto_pdf(texto):
+    # Resultado em latin-1: cada caractere é o byte cp1252 que o fpdf grava no PDF
+    return texto.encode("cp1252", "pei_pdf").decode("latin-1")
+
+@cronometrar("pdf.limpeza")
+def limpar_texto_pdf(texto):
+    if not texto: return ""
+    for marca, troca in MARCAS_MARKDOWN: texto = texto.replace(marca, troca)
+    return texto_pdf(texto)
+
+# --- PDF REFINADO ---
+# PDF_V3 (subclasse do FPDF) fica em pei/pdf.py: fpdf só é importado no primeiro PDF gerado.
+def __getattr__(nome):
+    if nome == "PDF_V3":
+        from pei.pdf import PDF_V3
+        return PDF_V3
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+@cronometrar("exportacao.pdf")
+def gerar_pdf(dados, tem_anexo):
+    from pei.pdf import PDF_V3
+    pdf = PDF_V3()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=20)
+    
+    # 1. Identificação
+    pdf.section_title("1. IDENTIFICAÇÃO E CONTEXTO")
+    pdf.set_font("Arial", size=10); pdf.set_text_color(0)
+    
+    nasc = dados['nasc'].strftime('%d/%m/%Y') if dados['nasc'] else "-"
+    diag_display = dados['diagnostico'] if dados['diagnostico'] else ("Em análise (Vide laudo anexo)" if tem_anexo else "Não informado")
+    med_display = dados['medicacao'] if dados['medicacao'] else "Não faz uso / Não informado"
+
+    txt_ident = (
+        f"Nome: {dados['nome']}\n"
+        f"Nascimento: {nasc}\n"
+        f"Série: {dados['serie']} | Turma: {dados['turma']}\n"
+        f"Diagnóstico: {diag_display}\n"
+        f"Medicação: {med_display}"
+    )
+    pdf.multi_cell(0, 6, limpar_texto_pdf(txt_ident))
+    
+    # 2. Rede de Apoio
+    if dados['rede_apoio'] or dados['orientacoes_especialistas']:
+        pdf.ln(3)
+        pdf.set_font("Arial", 'B', 10)
+        pdf.cell(0, 6, "Suporte Multidisciplinar:", 0, 1)
+        pdf.set_font("Arial", size=10)
+        
+        prof = ', '.join(dados['rede_apoio']) if dados['rede_apoio'] else "-"
+        ori = dados['orientacoes_especialistas'] if dados['orientacoes_especialistas'] else "-"
+        pdf.multi_cell(0, 6, limpar_texto_pdf(f"Profissionais: {prof}.\nOrientações: {ori}"))
+
+    # 3. Relatório IA (mesmo modelo analisado usado no DOCX)
+    if dados['ia_sugestao']:
+        pdf.ln(5)
+        pdf.relatorio(analisar_relatorio(dados['ia_sugestao']))
+        
+    # 4. Assinaturas
+    pdf.ln(20)
+    y = pdf.get_y()
+    if y > 250: pdf.add_page(); y = 40
+    pdf.line(20, y, 90, y); pdf.line(120, y, 190, y)
+    pdf.set_font("Arial", 'I', 8)
+    pdf.text(35, y+5, "Coordenação / Direção"); pdf.text(135, y+5, "Família / Responsável")
+    
+    return pdf.output(dest='S').encode('latin-1', 'replace')
+
+CONTROLES_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def relatorio_docx(doc, blocos):
+    # Parágrafos montados como um só trecho de XML: pela API de objetos do python-docx cada parágrafo
+    # custa ~170 µs (busca do estilo pelo nome, inserção elemento a elemento).
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+    estilos = {nome: doc.styles[nome].style_id for nome in ('Heading 2', 'Heading 3', 'List Bullet')}
+    partes = []
+    for bloco in blocos:
+        if bloco[0] == "titulo":
+            estilo = estilos['Heading 2' if bloco[1] <= 2 else 'Heading 3']
+            trechos = ((texto_simples(bloco[2]), False, False),)
+        else:
+            estilo = estilos['List Bullet'] if bloco[0] == "item" else None
+            trechos = bloco[1]
+        partes.append("<w:p>")
+        if estilo: partes.append(f'<w:pPr><w:pStyle w:val="{estilo}"/></w:pPr>')
+        for texto, negrito, italico in trechos:
+            rpr = ("<w:b/>" if negrito else "") + ("<w:i/>" if italico else "")
+            partes.append(f'<w:r>{f"<w:rPr>{rpr}</w:rPr>" if rpr else ""}'
+                          f'<w:t xml:space="preserve">{escape(CONTROLES_XML.sub("", texto))}</w:t></w:r>')
+        partes.append("</w:p>")
+    novos = parse_xml(f'<w:body {nsdecls("w")}>{"".join(partes)}</w:body>')
+    corpo = doc.element.body
+    for paragrafo in list(novos):
+        if corpo.sectPr is not None: corpo.sectPr.addprevious(paragrafo)
+        else: corpo.append(paragrafo)
+
+@cronometrar("exportacao.docx")
+def gerar_docx(dados):
+    from docx import Document
+    from docx.shared import Pt
+    doc = Document()
+    style = doc.styles['Normal']; style.font.name = 'Arial'; style.font.size = Pt(11)
+    
+    doc.add_heading('PLANO DE ENSINO INDIVIDUALIZADO', 0)
+    doc.add_paragraph(f"Estudante: {dados['nome']}")
+    doc.add_paragraph(f"Série: {dados['serie']} | Turma: {dados['turma']}")
+    doc.add_paragraph(f"Diagnóstico: {dados['diagnostico']}")
+    doc.add_paragraph(f"Medicação: {dados['medicacao']}")
+    
+    if dados['ia_sugestao']:
+        doc.add_heading('Parecer Pedagógico', level=1)
+        relatorio_docx(doc, analisar_relatorio(dados['ia_sugestao']))
+        
+    buffer = BytesIO(); doc.save(buffer); buffer.seek(0)
+    return buffer
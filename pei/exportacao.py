@@ -0,0 +1,127 @@
+import glob
+import os
+import re
+import tempfile
+import threading
+import time
+import zipfile
+from pei.cache import CacheLRU, chave_canonica
+from pei.metricas import registro
+
+# --- EXPORTAÇÃO SOB DEMANDA (PDF / DOCX) ---
+cache_documentos = CacheLRU(max_itens=64, max_bytes=64 * 1024 * 1024)
+
+def exportar(gerador, dados, *args):
+    # Só gera quando o download é pedido; documento igual nunca é refeito
+    chave = chave_canonica(gerador.__name__, dados, *args, ordenar_listas=False)
+    documento = cache_documentos.obter(chave)
+    if documento is None:
+        documento = gerador(dados, *args)
+        if hasattr(documento, "getvalue"): documento = documento.getvalue()
+        cache_documentos.guardar(chave, documento)
+    return documento
+
+# --- EXPORTAÇÃO DA TURMA (ZIP) ---
+# Cada estudante é renderizado num processo do pool; o ZIP é escrito em disco conforme os documentos
+# ficam prontos, com poucos em voo: o arquivo inteiro nunca fica na memória.
+MAX_PROCESSOS = int(os.environ.get("PEI_EXPORTACAO_PROCESSOS", min(4, os.cpu_count() or 1)))
+MIN_ESTUDANTES_PARALELO = 8  # ~50 ms por estudante: abaixo disso, subir processos custa mais
+FORMATOS = ("pdf", "docx")
+PREFIXO_ZIP = "pei_turma_"
+TTL_ZIP = 3600  # ZIP pronto fica 1 h no disco para a sessão baixar; depois é apagado por quem exportar em seguida
+_pool = None
+_pool_lock = threading.Lock()
+
+def _pool_processos():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            from multiprocessing import get_context
+            # spawn: o servidor do Streamlit tem várias threads, fork não é seguro
+            _pool = ProcessPoolExecutor(max_workers=MAX_PROCESSOS, mp_context=get_context("spawn"))
+        return _pool
+
+def _descartar_pool():
+    # Pool quebrado (processo morto): o próximo _pool_processos() cria outro
+    global _pool
+    with _pool_lock: _pool = None
+
+def _renderizar(dados, tem_anexo, formatos):
+    # Executa nos processos do pool
+    from pei.documento import gerar_docx, gerar_pdf
+    arquivos = []
+    if "pdf" in formatos: arquivos.append(("pdf", gerar_pdf(dados, tem_anexo)))
+    if "docx" in formatos: arquivos.append(("docx", gerar_docx(dados).getvalue()))
+    return arquivos
+
+def nome_arquivo(estudante_id, dados, extensao):
+    nome = re.sub(r'[^\w.-]+', '_', dados.get('nome') or "sem_nome").strip('_')
+    return f"PEI_{estudante_id:04d}_{nome}.{extensao}"
+
+def exportar_turma(armazenamento, ids, destino, formatos=FORMATOS, progresso=None):
+    # `destino`: caminho ou arquivo aberto; `progresso(feitos, total)` a cada estudante concluído
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from concurrent.futures.process import BrokenProcessPool
+    inicio = time.perf_counter()
+    ids = list(ids)
+    resumo = {"total": len(ids), "feitos": 0, "arquivos": 0, "falhas": []}
+    paralelo = MAX_PROCESSOS > 1 and len(ids) >= MIN_ESTUDANTES_PARALELO
+    pendentes = iter(ids)
+    em_voo = {}
+
+    def gravar(zf, estudante_id, dados, arquivos):
+        for extensao, conteudo in arquivos:
+            # .docx já é um zip: compactar de novo só gasta CPU
+            compressao = zipfile.ZIP_STORED if extensao == "docx" else zipfile.ZIP_DEFLATED
+            zf.writestr(nome_arquivo(estudante_id, dados, extensao), conteudo, compress_type=compressao)
+            resumo["arquivos"] += 1
+
+    def concluir():
+        resumo["feitos"] += 1
+        if progresso: progresso(resumo["feitos"], len(ids))
+
+    def submeter():
+        for estudante_id in pendentes:
+            dados, laudo = armazenamento.carregar(estudante_id)
+            if dados is None:
+                resumo["falhas"].append((estudante_id, "registro não encontrado")); concluir(); continue
+            if paralelo:
+                try: futuro = _pool_processos().submit(_renderizar, dados, bool(laudo), formatos)
+                except BrokenProcessPool:
+                    # Quebrou numa exportação anterior: refaz o pool
+                    _descartar_pool()
+                    futuro = _pool_processos().submit(_renderizar, dados, bool(laudo), formatos)
+                em_voo[futuro] = (estudante_id, dados, laudo)
+            else: em_voo[None] = (estudante_id, dados, laudo)
+            if len(em_voo) >= (MAX_PROCESSOS * 2 if paralelo else 1): return
+
+    with zipfile.ZipFile(destino, "w", compresslevel=6) as zf:
+        submeter()
+        while em_voo:
+            prontos = wait(em_voo, return_when=FIRST_COMPLETED)[0] if paralelo else [None]
+            for futuro in prontos:
+                estudante_id, dados, laudo = em_voo.pop(futuro)
+                try:
+                    try: arquivos = futuro.result() if futuro is not None else _renderizar(dados, bool(laudo), formatos)
+                    except BrokenProcessPool:
+                        # Pool quebrado: descarta e renderiza este estudante no próprio processo
+                        _descartar_pool()
+                        arquivos = _renderizar(dados, bool(laudo), formatos)
+                    gravar(zf, estudante_id, dados, arquivos)
+                except Exception as e: resumo["falhas"].append((estudante_id, str(e)))
+                concluir()
+            submeter()
+    resumo["segundos"] = round(time.perf_counter() - inicio, 2)
+    registro.observar("exportacao.turma", resumo["segundos"])
+    return resumo
+
+def arquivo_zip():
+    # Caminho novo para o ZIP da turma; apaga antes os de sessões que já não vão baixar
+    limite = time.time() - TTL_ZIP
+    for antigo in glob.glob(os.path.join(tempfile.gettempdir(), f"{PREFIXO_ZIP}*.zip")):
+        try:
+            if os.path.getmtime(antigo) < limite: os.unlink(antigo)
+        except OSError: pass  # outra sessão apagou primeiro
+    fd, caminho = tempfile.mkstemp(prefix=PREFIXO_ZIP, suffix=".zip"); os.close(fd)
+    return caminho
@@ -0,0 +1,238 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pei.bncc import candidatas, formatar
+from pei.cliente import criar_resposta, mensagem_erro
+from pei.condensacao import condensar_laudo
+from pei.metricas import contar_uso, cronometrar, medir, registro
+from pei.respostas import CAMPOS_PROMPT, cache_relatorios, chave_relatorio
+
+# --- INTELIGÊNCIA ARTIFICIAL (GPT-4o) ---
+MODELO_IA = os.environ.get("PEI_MODELO", "gpt-4o-mini")
+TEMPERATURA_IA = 0.7
+VERSAO_PROMPT = 4  # Incrementar ao mudar o prompt (invalida o cache de relatórios)
+
+# --- PROMPT ---
+# Instruções fixas na mensagem de sistema (igual em todo pedido do mesmo tipo); na do usuário, primeiro o
+# laudo (muda pouco para o mesmo estudante) e por último os campos do formulário, uma linha por campo
+# preenchido. Assim o início do pedido se repete entre gerações e entra no cache de prefixo da OpenAI.
+# (título, campos de `dados` usados na geração por seções, usa o laudo, instrução)
+SECOES = (
+    ("1. PERFIL",
+     ('nome', 'serie', 'diagnostico', 'medicacao', 'historico', 'familia', 'hiperfoco', 'potencias', 'rede_apoio', 'orientacoes_especialistas'),
+     True, "Sintetize o diagnóstico, o histórico e as *potencialidades* do estudante."),
+    ("2. BNCC",
+     ('serie', 'diagnostico', 'hiperfoco', 'potencias', 'b_sensorial', 'b_cognitiva', 'b_social'),  # os que escolhem as candidatas
+     False, "Escolha 1 das HABILIDADES BNCC candidatas, cite só o código (sem copiar a descrição) e adapte-a ao foco; sem candidatas, adapte 1 Habilidade Essencial da série."),
+    ("3. ESTRATÉGIAS",
+     ('diagnostico', 'medicacao', 'hiperfoco', 'potencias', 'b_sensorial', 'b_cognitiva', 'b_social',
+      'estrategias_acesso', 'estrategias_ensino', 'estrategias_avaliacao'),
+     False, "Explique como aplicar o suporte selecionado e usar os pontos fortes e o hiperfoco."),
+    ("4. CONCLUSÃO",
+     CAMPOS_PROMPT,
+     True, "Redija o parecer final."),
+)
+
+SECAO_BNCC = SECOES[1][0]
+
+ROTULOS = {
+    'nome': "Estudante", 'serie': "Série", 'diagnostico': "Diagnóstico", 'medicacao': "Medicação",
+    'historico': "Histórico", 'familia': "Família", 'hiperfoco': "Hiperfoco", 'potencias': "Pontos fortes",
+    'rede_apoio': "Rede de apoio", 'orientacoes_especialistas': "Orientações dos especialistas",
+    'b_sensorial': "Barreiras sensoriais", 'b_cognitiva': "Barreiras cognitivas", 'b_social': "Barreiras sociais",
+    'estrategias_acesso': "Acesso", 'estrategias_ensino': "Ensino", 'estrategias_avaliacao': "Avaliação",
+}
+
+PROMPT_SISTEMA = """Você é um Neuropsicopedagogo Sênior. Tarefa: redigir o PEI (Plano de Ensino Individualizado).
+Entrada: trechos do LAUDO ([...] = corte) e os campos preenchidos; ausente = não informado.
+Oriente o plano pelo Foco. Sem diagnóstico informado, extraia-o do laudo. Considere a medicação."""
+
+PEDIDO_RELATORIO = "GERE O RELATÓRIO, cada seção com título Markdown (## TÍTULO):\n" + "\n".join(
+    f"{titulo}: {instrucao}" for titulo, _, _, instrucao in SECOES)
+
+def _foco(dados):
+    diagnostico = (dados.get('diagnostico') or "").lower()
+    is_ahsd = "altas habilidades" in diagnostico or "superdotação" in diagnostico
+    return "ENRIQUECIMENTO E APROFUNDAMENTO" if is_ahsd else "FLEXIBILIZAÇÃO E SUPORTE"
+
+def _laudo_condensado(dados, contexto_pdf, campos=CAMPOS_PROMPT):
+    # Trechos do laudo mais relevantes para o estudante, dentro do orçamento de tokens.
+    # A relevância só considera `campos`: uma seção não muda quando mudam campos que ela não usa.
+    return condensar_laudo(contexto_pdf, {c: dados.get(c) for c in campos}) if contexto_pdf else "Sem laudo anexado."
+
+def _campos(dados, campos, bncc=False):
+    # Compacto: sem indentação, sem campos vazios
+    linhas = []
+    for campo in campos:
+        valor = dados.get(campo)
+        if isinstance(valor, (list, tuple)): valor = "; ".join(v.strip() for v in valor if v and v.strip())
+        valor = (valor or "").strip() if isinstance(valor, str) else valor
+        if valor: linhas.append(f"{ROTULOS[campo]}: {valor}")
+    linhas.append(f"Foco: {_foco(dados)}")
+    habilidades = candidatas(dados) if bncc else []
+    if habilidades: linhas.append("HABILIDADES BNCC candidatas:\n" + "\n".join(f"- {formatar(h)}" for h in habilidades))
+    return linhas
+
+def _mensagens(pedido, linhas, laudo=None):
+    if laudo is not None: linhas = [f"LAUDO:\n{laudo}", *linhas]
+    return [{"role": "system", "content": f"{PROMPT_SISTEMA}\n{pedido}"}, {"role": "user", "content": "\n".join(linhas)}]
+
+@cronometrar("prompt.montagem")
+def montar_mensagens(dados, contexto_pdf=""):
+    return _mensagens(PEDIDO_RELATORIO, _campos(dados, CAMPOS_PROMPT, bncc=True), _laudo_condensado(dados, contexto_pdf))
+
+def _chave_cache(dados, contexto_pdf):
+    return chave_relatorio(dados, contexto_pdf, MODELO_IA, TEMPERATURA_IA, VERSAO_PROMPT)
+
+def consultar_gpt(api_key, dados, contexto_pdf="", regenerar=False):
+    if not api_key: return None, "⚠️ Configure a Chave API OpenAI na barra lateral."
+    
+    chave = _chave_cache(dados, contexto_pdf)
+    if not regenerar:
+        salvo = cache_relatorios.obter(chave)
+        if salvo is not None:
+            registro.contar("cache_relatorio_acertos")
+            return salvo, None
+    try:
+        mensagens = montar_mensagens(dados, contexto_pdf)
+        with medir("openai.chamada", modelo=MODELO_IA):
+            response = criar_resposta(
+                api_key,
+                model=MODELO_IA,
+                messages=mensagens,
+                temperature=TEMPERATURA_IA
+            )
+        contar_uso(response.usage)
+        res = response.choices[0].message.content
+        cache_relatorios.guardar(chave, res)
+        return res, None
+    except Exception as e: return None, mensagem_erro(e)
+
+def consultar_gpt_stream(api_key, dados, contexto_pdf="", regenerar=False):
+    # Entrega o relatório em pedaços, conforme chegam da API
+    chave = _chave_cache(dados, contexto_pdf)
+    if not regenerar:
+        salvo = cache_relatorios.obter(chave)
+        if salvo is not None:
+            registro.contar("cache_relatorio_acertos")
+            yield salvo
+            return
+    mensagens = montar_mensagens(dados, contexto_pdf)
+    inicio = time.perf_counter()
+    stream = criar_resposta(
+        api_key,
+        model=MODELO_IA,
+        messages=mensagens,
+        temperature=TEMPERATURA_IA,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    partes = []
+    for chunk in stream:
+        if chunk.usage: contar_uso(chunk.usage)
+        if chunk.choices and chunk.choices[0].delta.content:
+            if not partes: registro.observar("openai.primeiro_token", time.perf_counter() - inicio)
+            partes.append(chunk.choices[0].delta.content)
+            yield partes[-1]
+    registro.observar("openai.stream", time.perf_counter() - inicio, modelo=MODELO_IA)
+    cache_relatorios.guardar(chave, "".join(partes))
+
+# --- GERAÇÃO POR SEÇÕES ---
+# Cada seção vira um pedido separado, todos em paralelo: o tempo total é o da seção mais lenta.
+# Cada pedido é um stream: a seção da vez aparece conforme chega (o primeiro token vem tão cedo quanto
+# no pedido único) e as seguintes, já adiantadas, saem de uma vez quando chega a vez delas.
+# A chave de cache de cada seção só leva os campos de que ela depende (e o laudo condensado por eles,
+# se ela usa o laudo): mudar uma barreira regenera BNCC (as candidatas dependem dela), ESTRATÉGIAS e
+# CONCLUSÃO; PERFIL vem do cache, mesmo com o laudo longo demais para entrar inteiro.
+POR_SECOES = os.environ.get("PEI_IA_POR_SECOES", "1") != "0"
+SECOES_PARALELAS = int(os.environ.get("PEI_IA_SECOES_PARALELAS", 16))
+
+_executor_secoes = None
+_executor_lock = threading.Lock()
+
+def _pool_secoes():
+    global _executor_secoes
+    with _executor_lock:
+        if _executor_secoes is None:
+            _executor_secoes = ThreadPoolExecutor(max_workers=SECOES_PARALELAS, thread_name_prefix="pei-secao")
+        return _executor_secoes
+
+def laudo_secao(secao, dados, contexto_pdf):
+    # Laudo condensado só pelos campos da seção (None se ela não usa o laudo)
+    _, campos, usa_laudo, _ = secao
+    return _laudo_condensado(dados, contexto_pdf, campos) if usa_laudo else None
+
+def montar_mensagens_secao(secao, dados, laudo):
+    titulo, campos, usa_laudo, instrucao = secao
+    pedido = f"ESCREVA APENAS A SEÇÃO {titulo}, sem o título. {instrucao}"
+    return _mensagens(pedido, _campos(dados, campos, bncc=titulo == SECAO_BNCC), laudo if usa_laudo else None)
+
+def consultar_secao(api_key, secao, dados, laudo, regenerar=False, parte=None):
+    # `laudo` já condensado para a seção (laudo_secao): é o texto que de fato entra no prompt (e na chave).
+    # `parte(texto)` recebe cada pedaço conforme chega; devolve a seção inteira.
+    titulo, campos, usa_laudo, _ = secao
+    chave = chave_relatorio(dados, laudo if usa_laudo else "", MODELO_IA, TEMPERATURA_IA, VERSAO_PROMPT, campos=campos, secao=titulo)
+    if not regenerar:
+        salvo = cache_relatorios.obter(chave)
+        if salvo is not None:
+            registro.contar("cache_secao_acertos")
+            if parte: parte(salvo)
+            return salvo
+    partes = []
+    with medir("openai.secao", modelo=MODELO_IA, secao=titulo):
+        stream = criar_resposta(
+            api_key,
+            model=MODELO_IA,
+            messages=montar_mensagens_secao(secao, dados, laudo),
+            temperature=TEMPERATURA_IA,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        for chunk in stream:
+            if chunk.usage: contar_uso(chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                partes.append(chunk.choices[0].delta.content)
+                if parte: parte(partes[-1])
+    res = "".join(partes).strip()
+    cache_relatorios.guardar(chave, res)
+    return res
+
+def _secao_na_fila(api_key, secao, dados, laudo, regenerar, fila):
+    # Pedaços, depois None (fim) ou a exceção
+    try: consultar_secao(api_key, secao, dados, laudo, regenerar, fila.put)
+    except Exception as e: fila.put(e)
+    else: fila.put(None)
+
+def consultar_gpt_secoes_stream(api_key, dados, contexto_pdf="", regenerar=False):
+    # Dispara todas as seções juntas e entrega cada uma na ordem do relatório, pedaço a pedaço
+    inicio = time.perf_counter()
+    filas = [queue.Queue() for _ in SECOES]
+    futuros = [_pool_secoes().submit(_secao_na_fila, api_key, s, dados, laudo_secao(s, dados, contexto_pdf), regenerar, f)
+               for s, f in zip(SECOES, filas)]
+    primeiro = True
+    try:
+        for i, ((titulo, *_), fila) in enumerate(zip(SECOES, filas)):
+            separador = "\n\n" if i else ""
+            yield f"{separador}## {titulo}\n\n"
+            # Sem espaços nas pontas da seção (como no cache): o início é descartado, o fim só sai se vier mais texto
+            pendente, comecou = "", False
+            while (pedaco := fila.get()) is not None:
+                if isinstance(pedaco, Exception): raise pedaco
+                if not comecou: pedaco = pedaco.lstrip()
+                texto = pendente + pedaco
+                corpo = texto.rstrip()
+                pendente = texto[len(corpo):]
+                if not corpo: continue
+                if primeiro: registro.observar("openai.primeiro_token", time.perf_counter() - inicio); primeiro = False
+                comecou = True
+                yield corpo
+    finally:
+        for futuro in futuros: futuro.cancel()
+    registro.observar("openai.secoes", time.perf_counter() - inicio, modelo=MODELO_IA)
+
+def consultar_gpt_secoes(api_key, dados, contexto_pdf="", regenerar=False):
+    if not api_key: return None, "⚠️ Configure a Chave API OpenAI na barra lateral."
+    try: return "".join(consultar_gpt_secoes_stream(api_key, dados, contexto_pdf, regenerar)), None
+    except Exception as e: return None, mensagem_erro(e)
@@ -0,0 +1,155 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+from pei.cache import CacheLRU, CacheSQLite, CacheEmCamadas, diretorio_cache, hash_bytes
+from pei.metricas import cronometrar, registro
+
+# --- LEITURA DO LAUDO (PDF) ---
+# pypdf e o pool de processos só são carregados quando um laudo é de fato lido.
+TTL_LAUDO = 30 * 24 * 3600
+ORCAMENTO_CARACTERES = int(os.environ.get("PEI_LAUDO_ORCAMENTO", 60000))  # ~15 mil tokens
+MAX_PROCESSOS = int(os.environ.get("PEI_LAUDO_PROCESSOS", min(4, os.cpu_count() or 1)))
+MIN_PAGINAS_PARALELO = 8  # abaixo disso, subir processos custa mais que ler em série
+PAGINAS_POR_TAREFA = 4
+VERSAO_EXTRACAO = 2
+
+def _criar_cache():
+    memoria = CacheLRU(max_itens=512, max_bytes=32 * 1024 * 1024, ttl=TTL_LAUDO)
+    pasta = diretorio_cache()
+    disco = CacheSQLite(os.path.join(pasta, "laudos.sqlite"), ttl=TTL_LAUDO) if pasta else None
+    return CacheEmCamadas(memoria, disco)
+
+cache_laudos = _criar_cache()
+_pool = None
+_pool_lock = threading.Lock()
+
+def _pool_processos():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            from multiprocessing import get_context
+            # spawn: o servidor do Streamlit tem várias threads, fork não é seguro
+            _pool = ProcessPoolExecutor(max_workers=MAX_PROCESSOS, mp_context=get_context("spawn"))
+        return _pool
+
+def _conteudo(arquivo):
+    if isinstance(arquivo, (bytes, bytearray)): return bytes(arquivo)
+    if hasattr(arquivo, "getvalue"): return arquivo.getvalue()
+    arquivo.seek(0)
+    return arquivo.read()
+
+def _ler_paginas(origem, inicio, fim):
+    # Executa nos processos do pool: `origem` é o caminho de um arquivo temporário
+    from pypdf import PdfReader
+    reader = PdfReader(origem)
+    paginas = []
+    for i in range(inicio, fim):
+        t = time.perf_counter()
+        texto = reader.pages[i].extract_text() or ""
+        paginas.append((i, texto, time.perf_counter() - t))
+    return paginas
+
+def _serie(reader, total):
+    for i in range(total):
+        t = time.perf_counter()
+        texto = reader.pages[i].extract_text() or ""
+        yield i, texto, time.perf_counter() - t
+
+def _paralelo(conteudo, total):
+    # Poucas tarefas em voo e consumidas em ordem: ao atingir o orçamento, o resto é cancelado
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(conteudo)
+    em_voo = []
+    try:
+        pool = _pool_processos()
+        faixas = [(i, min(i + PAGINAS_POR_TAREFA, total)) for i in range(0, total, PAGINAS_POR_TAREFA)]
+        for faixa in faixas[:MAX_PROCESSOS * 2]: em_voo.append(pool.submit(_ler_paginas, tmp.name, *faixa))
+        proxima = len(em_voo)
+        while em_voo:
+            paginas = em_voo.pop(0).result()
+            if proxima < len(faixas):
+                em_voo.append(pool.submit(_ler_paginas, tmp.name, *faixas[proxima])); proxima += 1
+            yield from paginas
+    finally:
+        for futuro in em_voo: futuro.cancel()
+        os.unlink(tmp.name)
+
+def _consumir(paginas, orcamento):
+    partes, tempos = [], []
+    usados = 0
+    truncados = 0
+    try:
+        for i, texto, segundos in paginas:
+            tempos.append([i + 1, round(segundos, 4)])
+            if usados + len(texto) + 1 > orcamento:
+                truncados = len(texto) + 1 - (orcamento - usados)
+                texto = texto[:max(0, orcamento - usados - 1)]
+            partes.append(texto + "\n"); usados += len(texto) + 1
+            if usados >= orcamento: break
+    finally: paginas.close()
+    return "".join(partes), tempos, max(0, truncados)
+
+@cronometrar("laudo.extracao")
+def extrair_laudo(conteudo, orcamento=None, paralelo=True):
+    global _pool
+    from concurrent.futures.process import BrokenProcessPool
+    from pypdf import PdfReader
+    orcamento = ORCAMENTO_CARACTERES if orcamento is None else orcamento
+    inicio = time.perf_counter()
+    reader = PdfReader(BytesIO(conteudo))
+    total = len(reader.pages)
+    usar_pool = paralelo and MAX_PROCESSOS > 1 and total >= MIN_PAGINAS_PARALELO
+    if usar_pool:
+        try: texto, tempos, truncados = _consumir(_paralelo(conteudo, total), orcamento)
+        except BrokenProcessPool:
+            # Pool quebrado: descarta e lê em série no próprio processo
+            with _pool_lock: _pool = None
+            usar_pool = False
+    if not usar_pool:
+        texto, tempos, truncados = _consumir(_serie(reader, total), orcamento)
+    lidas = len(tempos)
+    return {
+        "texto": texto,
+        "paginas_total": total,
+        "paginas_lidas": lidas,
+        "paginas_descartadas": list(range(lidas + 1, total + 1)),
+        "caracteres_truncados": truncados,
+        "orcamento": orcamento,
+        "tempos": tempos,
+        "segundos": round(time.perf_counter() - inicio, 4),
+        "paralelo": usar_pool,
+    }
+
+def ler_laudo(arquivo, orcamento=None):
+    conteudo = _conteudo(arquivo)
+    orcamento = ORCAMENTO_CARACTERES if orcamento is None else orcamento
+    # Chave = hash do arquivo: o mesmo laudo é lido uma única vez, em qualquer sessão
+    chave = f"{hash_bytes(conteudo)}:v{VERSAO_EXTRACAO}:o{orcamento}"
+    salvo = cache_laudos.obter(chave)
+    if salvo is not None:
+        registro.contar("cache_laudo_acertos")
+        return json.loads(salvo)
+    resultado = extrair_laudo(conteudo, orcamento)
+    cache_laudos.guardar(chave, json.dumps(resultado, ensure_ascii=False))
+    return resultado
+
+def resumo_extracao(info):
+    texto = f"{info['paginas_lidas']} de {info['paginas_total']} páginas lidas em {info['segundos']:.2f} s"
+    if info["tempos"]:
+        pagina, segundos = max(info["tempos"], key=lambda t: t[1])
+        texto += f" (mais lenta: pág. {pagina}, {segundos:.2f} s)"
+    descartadas = info["paginas_descartadas"]
+    if descartadas or info["caracteres_truncados"]:
+        texto += f". Orçamento de {info['orcamento']} caracteres atingido"
+        if descartadas: texto += f": páginas {descartadas[0]}–{descartadas[-1]} descartadas"
+        if info["caracteres_truncados"]: texto += f", {info['caracteres_truncados']} caracteres cortados da pág. {info['paginas_lidas']}"
+    return texto + "."
+
+def ler_pdf(arquivo):
+    if arquivo is None: return ""
+    try: return ler_laudo(arquivo)["texto"]
+    except Exception as e: return f"Erro ao ler PDF: {e}"
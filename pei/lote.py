@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import sys
+import time
+from pei.dados import normalizar_dados
+from pei.documento import gerar_docx, gerar_pdf
+from pei.ia import consultar_gpt, montar_mensagens
+from pei.laudo import ler_laudo
+
+# --- GERAÇÃO EM LOTE (SEM INTERFACE) ---
+# Uso: python -m pei.lote alunos.csv --saida peis/ --concorrencia 8 --tpm 200000
+TOKENS_SAIDA_ESTIMADOS = 1500
+
+def ler_registros(caminho):
+    if caminho.lower().endswith(".csv"):
+        with open(caminho, newline="", encoding="utf-8-sig") as f:
+            return list(csv.DictReader(f))
+    with open(caminho, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+def identificador(registro, indice):
+    if registro.get("id"): base = str(registro["id"])
+    else: base = f"{indice:04d}_{registro.get('nome', '')}_{registro.get('turma', '')}"
+    return re.sub(r'[^\w.-]+', '_', base).strip('_')
+
+def laudo_do_registro(registro, pasta_base):
+    # 'laudo' = caminho de um PDF; 'pdf_text' = texto já extraído
+    if registro.get("pdf_text"): return registro["pdf_text"]
+    caminho = registro.get("laudo")
+    if not caminho: return ""
+    if not os.path.isabs(caminho): caminho = os.path.join(pasta_base, caminho)
+    # ler_laudo, não ler_pdf: PDF ilegível tem de falhar o registro (e ser refeito ao retomar),
+    # não virar "Erro ao ler PDF" dentro do prompt
+    with open(caminho, "rb") as f: conteudo = f.read()
+    try: return ler_laudo(conteudo)["texto"]
+    except Exception as e: raise ValueError(f"laudo ilegível ({registro['laudo']}): {e}") from e
+
+def estimar_tokens(mensagens):
+    return sum(len(m["content"]) for m in mensagens) // 4 + TOKENS_SAIDA_ESTIMADOS
+
+class LimitadorTPM:
+    # Balde de tokens: reabastece `tpm` tokens por minuto
+    def __init__(self, tpm):
+        self.capacidade = tpm
+        self.disponivel = tpm
+        self.atualizado = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def reservar(self, tokens):
+        tokens = min(tokens, self.capacidade)
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                self.disponivel = min(self.capacidade, self.disponivel + (agora - self.atualizado) * self.capacidade / 60)
+                self.atualizado = agora
+                if self.disponivel >= tokens:
+                    self.disponivel -= tokens
+                    return
+                await asyncio.sleep((tokens - self.disponivel) * 60 / self.capacidade)
+
+def carregar_checkpoint(caminho):
+    concluidos = set()
+    if os.path.exists(caminho):
+        with open(caminho, encoding="utf-8") as f:
+            for linha in f:
+                try: item = json.loads(linha)
+                except ValueError: continue  # linha truncada por uma queda
+                if item.get("status") == "ok": concluidos.add(item["id"])
+    return concluidos
+
+async def processar_lote(registros, api_key, saida, concorrencia=4, tpm=150000, formatos=("pdf", "docx"), pasta_base="."):
+    os.makedirs(saida, exist_ok=True)
+    caminho_checkpoint = os.path.join(saida, "checkpoint.jsonl")
+    concluidos = carregar_checkpoint(caminho_checkpoint)
+    pendentes = [(identificador(r, i), r) for i, r in enumerate(registros)]
+    pendentes = [(i, r) for i, r in pendentes if i not in concluidos]
+    semaforo = asyncio.Semaphore(concorrencia)
+    limitador = LimitadorTPM(tpm)
+    lock_checkpoint = asyncio.Lock()
+    resumo = {"total": len(registros), "pulados": len(registros) - len(pendentes), "ok": 0, "falhas": 0, "tokens_estimados": 0}
+
+    async def registrar(item):
+        async with lock_checkpoint:
+            with open(caminho_checkpoint, "a", encoding="utf-8") as f:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n"); f.flush(); os.fsync(f.fileno())
+
+    async def gerar(id_registro, registro):
+        async with semaforo:
+            inicio = time.monotonic()
+            try:
+                dados = normalizar_dados(registro)
+                laudo = await asyncio.to_thread(laudo_do_registro, registro, pasta_base)
+                tokens = estimar_tokens(montar_mensagens(dados, laudo))
+                await limitador.reservar(tokens)
+                res, err = await asyncio.to_thread(consultar_gpt, api_key, dados, laudo)
+                if err: raise RuntimeError(err)
+                dados['ia_sugestao'] = res
+                if "pdf" in formatos:
+                    conteudo = await asyncio.to_thread(gerar_pdf, dados, bool(laudo))
+                    with open(os.path.join(saida, f"PEI_{id_registro}.pdf"), "wb") as f: f.write(conteudo)
+                if "docx" in formatos:
+                    conteudo = await asyncio.to_thread(gerar_docx, dados)
+                    with open(os.path.join(saida, f"PEI_{id_registro}.docx"), "wb") as f: f.write(conteudo.getvalue())
+                resumo["ok"] += 1; resumo["tokens_estimados"] += tokens
+                await registrar({"id": id_registro, "status": "ok", "segundos": round(time.monotonic() - inicio, 2)})
+            except Exception as e:
+                resumo["falhas"] += 1
+                await registrar({"id": id_registro, "status": "erro", "erro": str(e)})
+
+    inicio = time.monotonic()
+    await asyncio.gather(*(gerar(i, r) for i, r in pendentes))
+    resumo["segundos"] = round(time.monotonic() - inicio, 2)
+    minutos = max(resumo["segundos"], 1e-9) / 60
+    resumo["peis_por_minuto"] = round(resumo["ok"] / minutos, 2)
+    resumo["tokens_por_minuto"] = round(resumo["tokens_estimados"] / minutos)
+    return resumo
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pei.lote", description="Gera PEIs em lote a partir de um CSV/JSONL.")
+    parser.add_argument("entrada", help="CSV ou JSONL com as mesmas chaves de st.session_state.dados")
+    parser.add_argument("--saida", default="peis_gerados", help="Pasta dos PDF/DOCX e do checkpoint")
+    parser.add_argument("--concorrencia", type=int, default=4, help="Gerações simultâneas")
+    parser.add_argument("--tpm", type=int, default=150000, help="Limite de tokens por minuto")
+    parser.add_argument("--formatos", default="pdf,docx", help="pdf, docx ou pdf,docx")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY"), help="Padrão: $OPENAI_API_KEY")
+    args = parser.parse_args(argv)
+    if not args.api_key: parser.error("Informe --api-key ou defina OPENAI_API_KEY.")
+
+    registros = ler_registros(args.entrada)
+    formatos = tuple(f.strip() for f in args.formatos.split(",") if f.strip())
+    pasta_base = os.path.dirname(os.path.abspath(args.entrada))
+    resumo = asyncio.run(processar_lote(registros, args.api_key, args.saida, args.concorrencia, args.tpm, formatos, pasta_base))
+    print(json.dumps(resumo, ensure_ascii=False, indent=2))
+    return 0 if resumo["falhas"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- INSTRUMENTAÇÃO (TEMPOS E TOKENS) ---
+# Cada etapa guarda as últimas JANELA medições; contadores acumulam desde o início do processo.
+# Log estruturado: logger "pei.metricas" em nível INFO (uma linha JSON por medição).
+JANELA = 1000
+logger = logging.getLogger("pei.metricas")
+
+class Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._amostras = defaultdict(lambda: deque(maxlen=JANELA))
+        self._totais = defaultdict(lambda: [0, 0.0])
+        self._contadores = defaultdict(float)
+
+    def observar(self, etapa, segundos, **extras):
+        with self._lock:
+            self._amostras[etapa].append(segundos)
+            total = self._totais[etapa]; total[0] += 1; total[1] += segundos
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"ts": round(time.time(), 3), "etapa": etapa, "ms": round(segundos * 1000, 2), **extras}, ensure_ascii=False))
+
+    def contar(self, nome, valor=1):
+        with self._lock: self._contadores[nome] += valor
+
+    def resumo(self):
+        with self._lock:
+            amostras = {k: sorted(v) for k, v in self._amostras.items()}
+            totais = {k: list(v) for k, v in self._totais.items()}
+            contadores = dict(self._contadores)
+        etapas = {}
+        for etapa, valores in sorted(amostras.items()):
+            if not valores: continue
+            pct = lambda p: valores[min(len(valores) - 1, int(p * len(valores)))]
+            etapas[etapa] = {
+                "n": totais[etapa][0], "total_s": round(totais[etapa][1], 4),
+                "media_ms": round(sum(valores) / len(valores) * 1000, 2),
+                "p50_ms": round(pct(0.50) * 1000, 2), "p95_ms": round(pct(0.95) * 1000, 2),
+                "max_ms": round(valores[-1] * 1000, 2),
+            }
+        return {"etapas": etapas, "contadores": contadores}
+
+    def prometheus(self):
+        resumo = self.resumo()
+        linhas = ["# TYPE pei_etapa_segundos summary"]
+        for etapa, r in resumo["etapas"].items():
+            rotulo = f'etapa="{etapa}"'
+            linhas.append(f'pei_etapa_segundos{{{rotulo},quantile="0.5"}} {round(r["p50_ms"] / 1000, 6)}')
+            linhas.append(f'pei_etapa_segundos{{{rotulo},quantile="0.95"}} {round(r["p95_ms"] / 1000, 6)}')
+            linhas.append(f'pei_etapa_segundos_count{{{rotulo}}} {r["n"]}')
+            linhas.append(f'pei_etapa_segundos_sum{{{rotulo}}} {r["total_s"]}')
+        linhas.append("# TYPE pei_contador counter")
+        for nome, valor in sorted(resumo["contadores"].items()):
+            linhas.append(f'pei_contador{{nome="{nome}"}} {valor}')
+        return "\n".join(linhas) + "\n"
+
+    def limpar(self):
+        with self._lock:
+            self._amostras.clear(); self._totais.clear(); self._contadores.clear()
+
+registro = Registro()
+
+@contextmanager
+def medir(etapa, **extras):
+    inicio = time.perf_counter()
+    try: yield
+    finally: registro.observar(etapa, time.perf_counter() - inicio, **extras)
+
+def cronometrar(etapa):
+    def decorador(funcao):
+        @wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with medir(etapa): return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+def contar_uso(uso):
+    # `uso` = response.usage da OpenAI (pode faltar em respostas de cache/stream antigo)
+    if uso is None: return
+    registro.contar("tokens_prompt", getattr(uso, "prompt_tokens", 0) or 0)
+    registro.contar("tokens_resposta", getattr(uso, "completion_tokens", 0) or 0)
+    detalhes = getattr(uso, "prompt_tokens_details", None)
+    if detalhes is not None: registro.contar("tokens_prompt_em_cache", getattr(detalhes, "cached_tokens", 0) or 0)
+
+# --- EXPORTAÇÃO PARA COLETA (PROMETHEUS / JSON) ---
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args): pass
+
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            corpo, tipo = json.dumps(registro.resumo(), ensure_ascii=False).encode(), "application/json"
+        elif self.path.startswith("/metrics"):
+            corpo, tipo = registro.prometheus().encode(), "text/plain; version=0.0.4"
+        else:
+            self.send_response(404); self.end_headers(); return
+        self.send_response(200)
+        self.send_header("Content-Type", tipo); self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers(); self.wfile.write(corpo)
+
+_servidor = None
+_servidor_lock = threading.Lock()
+
+def iniciar_servidor(porta=None):
+    # PEI_METRICAS_PORTA=9464 expõe /metrics e /metrics.json; uma vez por processo
+    global _servidor
+    porta = porta or os.environ.get("PEI_METRICAS_PORTA")
+    if not porta: return None
+    with _servidor_lock:
+        if _servidor is None:
+            try: _servidor = ThreadingHTTPServer(("0.0.0.0", int(porta)), _Handler)
+            except OSError: return None
+            threading.Thread(target=_servidor.serve_forever, daemon=True, name="pei-metricas").start()
+        return _servidor
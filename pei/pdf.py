@@ -0,0 +1,132 @@
+import re
+import zlib
+from fpdf import FPDF
+from pei.ativos import ativos
+from pei.documento import texto_pdf
+from pei.relatorio import texto_simples
+
+# --- PDF REFINADO ---
+# Importado só por gerar_pdf(): abrir o app não carrega o fpdf.
+def desenhar_moldura(pdf, logo):
+    # Parte fixa do cabeçalho: borda, logo, título e subtítulo
+    pdf.set_draw_color(0, 78, 146)
+    pdf.set_line_width(0.4)
+    pdf.rect(5, 5, 200, 287)
+
+    if logo:
+        pdf.image(logo, 12, 12, 22)
+        x_offset = 40
+    else: x_offset = 12
+
+    pdf.set_xy(x_offset, 15)
+    pdf.set_font('Arial', 'B', 14)
+    pdf.set_text_color(0, 78, 146)
+    pdf.cell(0, 8, 'PLANO DE ENSINO INDIVIDUALIZADO', 0, 1, 'L')
+
+    pdf.set_xy(x_offset, 22)
+    pdf.set_font('Arial', 'I', 9)
+    pdf.set_text_color(100)
+    pdf.cell(0, 5, 'Documento Oficial de Planejamento Pedagógico', 0, 1, 'L')
+
+# A moldura é desenhada uma vez por processo num rascunho; cada documento a grava uma vez como
+# Form XObject (/TPL) e cada página só a carimba ("/TPL Do"). O PNG do logo também é lido uma vez só.
+RECURSO = re.compile(r"/([FI])(\d+)\b")
+
+class PDF_V3(FPDF):
+    _molduras = {}  # (logo, w, h) -> (operadores, fontes {i: chave}, imagem analisada)
+
+    @classmethod
+    def _moldura_pronta(cls, logo, w, h):
+        chave = (logo, w, h)
+        if chave not in cls._molduras:
+            rascunho = FPDF('P', 'mm', (w, h))
+            rascunho.add_page()
+            inicio = len(rascunho.pages[1])
+            desenhar_moldura(rascunho, logo)
+            fontes = {f['i']: chave_fonte for chave_fonte, f in rascunho.fonts.items()}
+            imagem = dict(rascunho.images[logo]) if logo else None
+            cls._molduras[chave] = (rascunho.pages[1][inicio:], fontes, imagem)
+        return cls._molduras[chave]
+
+    def _preparar_moldura(self):
+        logo = ativos()["logo_pdf"]
+        operadores, fontes, imagem = self._moldura_pronta(logo, self.w, self.h)
+        # Registra no documento as fontes e o logo usados pela moldura e renumera as referências
+        for chave_fonte in fontes.values():
+            if chave_fonte not in self.fonts:
+                familia = chave_fonte.rstrip("BIU")
+                self.set_font(familia, chave_fonte[len(familia):])
+        if imagem and logo not in self.images: self.images[logo] = {**imagem, 'i': len(self.images) + 1}
+        def renumerar(m):
+            if m.group(1) == "F": return f"/F{self.fonts[fontes[int(m.group(2))]]['i']}"
+            return f"/I{self.images[logo]['i']}"
+        self._moldura = RECURSO.sub(renumerar, operadores)
+
+    def header(self):
+        if getattr(self, "_moldura", None) is None: self._preparar_moldura()
+        self._out("q /TPL Do Q")
+        # Mesma posição em que o cabeçalho desenhado deixava o cursor
+        self.set_xy(self.l_margin, 27 + 15)
+
+    def _putimages(self):
+        super()._putimages()
+        self._moldura_n = None
+        if getattr(self, "_moldura", None) is None: return
+        corpo = self._moldura.encode("latin-1")
+        filtro = ""
+        if self.compress: corpo, filtro = zlib.compress(corpo), "/Filter /FlateDecode "
+        self._newobj(); self._moldura_n = self.n
+        self._out(f"<</Type /XObject /Subtype /Form /BBox [0 0 {self.w_pt:.2f} {self.h_pt:.2f}] /Resources 2 0 R {filtro}/Length {len(corpo)}>>")
+        self._putstream(corpo)
+        self._out("endobj")
+
+    def _putxobjectdict(self):
+        super()._putxobjectdict()
+        if self._moldura_n: self._out(f"/TPL {self._moldura_n} 0 R")
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.set_text_color(128)
+        self.cell(0, 10, f'Gerado via PEI 360º | Página {self.page_no()}', 0, 0, 'C')
+
+    def section_title(self, label):
+        self.ln(5)
+        self.set_fill_color(240, 248, 255)
+        self.set_text_color(0, 78, 146)
+        self.set_font('Arial', 'B', 11)
+        self.cell(0, 8, f"  {label}", 0, 1, 'L', fill=True)
+        self.ln(3)
+
+    def trechos(self, partes, altura=6, tamanho=10):
+        # Texto corrido com negrito/itálico; quebra de linha pelo próprio write()
+        if len(partes) == 1 and not (partes[0][1] or partes[0][2]):
+            # Sem ênfase (a maioria dos parágrafos): multi_cell é bem mais rápido que write()
+            self.set_font('Arial', '', tamanho)
+            self.multi_cell(0, altura, texto_pdf(partes[0][0]))
+            return
+        for texto, negrito, italico in partes:
+            self.set_font('Arial', ('B' if negrito else '') + ('I' if italico else ''), tamanho)
+            self.write(altura, texto_pdf(texto))
+        self.ln(altura)
+
+    def relatorio(self, blocos):
+        self.set_text_color(0)
+        for bloco in blocos:
+            if bloco[0] == "titulo":
+                _, nivel, partes = bloco
+                if nivel <= 2: self.section_title(texto_pdf(texto_simples(partes)))
+                else:
+                    self.ln(2); self.set_text_color(0, 78, 146)
+                    self.trechos([(t, True, i) for t, _, i in partes], tamanho=10.5)
+                    self.set_text_color(0)
+            elif bloco[0] == "item":
+                margem = self.l_margin
+                self.set_font('Arial', '', 10)
+                self.cell(5, 6, texto_pdf("•"))
+                self.set_left_margin(margem + 5)
+                self.trechos(bloco[1])
+                self.set_left_margin(margem); self.set_x(margem)
+            else:
+                self.trechos(bloco[1])
+                self.ln(1)
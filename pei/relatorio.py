@@ -0,0 +1,40 @@
+import re
+from functools import lru_cache
+
+# --- MODELO DO RELATÓRIO (MARKDOWN DA IA -> BLOCOS) ---
+# O parecer é analisado uma vez; PDF e DOCX só percorrem os blocos.
+# Bloco: ("titulo", nivel, trechos) | ("item", trechos) | ("paragrafo", trechos)
+# Trecho: (texto, negrito, italico)
+TITULO = re.compile(r"^(#{1,6})\s+(.*)$")
+ITEM = re.compile(r"^\s*[-*•]\s+(.*)$")
+ENFASE = re.compile(r"\*\*(.+?)\*\*|__(.+?)__|(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])")
+
+def trechos(texto):
+    partes, inicio = [], 0
+    for m in ENFASE.finditer(texto):
+        if m.start() > inicio: partes.append((texto[inicio:m.start()], False, False))
+        negrito = m.group(1) or m.group(2)
+        partes.append((negrito, True, False) if negrito else (m.group(3), False, True))
+        inicio = m.end()
+    if inicio < len(texto): partes.append((texto[inicio:], False, False))
+    return tuple(p for p in partes if p[0])
+
+@lru_cache(maxsize=64)
+def analisar_relatorio(texto):
+    blocos = []
+    for linha in (texto or "").splitlines():
+        linha = linha.rstrip()
+        if not linha.strip(): continue
+        if m := TITULO.match(linha):
+            blocos.append(("titulo", len(m.group(1)), trechos(m.group(2).strip("*_ ").strip())))
+        elif m := ITEM.match(linha):
+            blocos.append(("item", trechos(m.group(1))))
+        elif linha.startswith("**") and linha.endswith("**") and linha.count("**") == 2:
+            # Linha inteira em negrito ("**1. PERFIL**") funciona como subtítulo
+            blocos.append(("titulo", 3, trechos(linha[2:-2].strip())))
+        else:
+            blocos.append(("paragrafo", trechos(linha.strip())))
+    return tuple(blocos)
+
+def texto_simples(partes):
+    return "".join(p[0] for p in partes)
@@ -0,0 +1,26 @@
+import os
+from pei.cache import CacheLRU, CacheSQLite, CacheEmCamadas, chave_canonica, diretorio_cache
+
+# --- CACHE DE RELATÓRIOS GERADOS ---
+TTL_RELATORIO = 90 * 24 * 3600
+
+# Campos de `dados` que entram no prompt (ia_sugestao, nasc e turma não entram)
+CAMPOS_PROMPT = (
+    'nome', 'serie', 'diagnostico', 'medicacao', 'hiperfoco', 'potencias',
+    'historico', 'familia', 'rede_apoio', 'orientacoes_especialistas',
+    'b_sensorial', 'b_cognitiva', 'b_social',
+    'estrategias_acesso', 'estrategias_ensino', 'estrategias_avaliacao',
+)
+
+def _criar_cache():
+    memoria = CacheLRU(max_itens=256, max_bytes=16 * 1024 * 1024, ttl=TTL_RELATORIO)
+    pasta = diretorio_cache()
+    disco = CacheSQLite(os.path.join(pasta, "relatorios.sqlite"), max_bytes=128 * 1024 * 1024, ttl=TTL_RELATORIO) if pasta else None
+    return CacheEmCamadas(memoria, disco)
+
+cache_relatorios = _criar_cache()
+
+def chave_relatorio(dados, contexto_pdf, modelo, temperatura, versao_prompt, campos=CAMPOS_PROMPT, secao=None):
+    entrada = {c: dados.get(c) for c in campos}
+    if secao: return chave_canonica(entrada, contexto_pdf or "", modelo, temperatura, versao_prompt, secao)
+    return chave_canonica(entrada, contexto_pdf or "", modelo, temperatura, versao_prompt)
@@ -0,0 +1,176 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- PROVEDOR SIMULADO (SERVIDOR LOCAL COMPATÍVEL COM A API DA OPENAI) ---
+# Responde /v1/chat/completions sem rede e sem custo, para testes de carga e benchmarks do pipeline inteiro.
+# O texto depende só das mensagens (mesmo prompt => mesmo relatório); latência, velocidade do stream,
+# 429 e travamentos são configuráveis e sorteados com semente fixa.
+# Uso: PEI_PROVEDOR=simulado streamlit run app.py                  (servidor dentro do próprio processo)
+#      python -m pei.simulado --porta 8765 --taxa-429 0.05         (servidor separado; no app:
+#      PEI_OPENAI_BASE_URL=http://127.0.0.1:8765/v1)
+def _config_do_ambiente():
+    return {
+        "latencia": float(os.environ.get("PEI_SIMULADO_LATENCIA", 0.3)),      # s até o primeiro token
+        "tokens_s": float(os.environ.get("PEI_SIMULADO_TOKENS_S", 80)),       # velocidade do stream (0 = sem espera)
+        "palavras": int(os.environ.get("PEI_SIMULADO_PALAVRAS", 120)),       # tamanho de cada seção
+        "taxa_429": float(os.environ.get("PEI_SIMULADO_TAXA_429", 0)),       # fração de pedidos recusados
+        "taxa_timeout": float(os.environ.get("PEI_SIMULADO_TAXA_TIMEOUT", 0)),
+        "travamento": float(os.environ.get("PEI_SIMULADO_TRAVAMENTO", 65)),  # s sem resposta num "timeout"
+        "retry_after_ms": int(os.environ.get("PEI_SIMULADO_RETRY_AFTER_MS", 200)),
+        "semente": int(os.environ.get("PEI_SIMULADO_SEMENTE", 360)),
+    }
+
+config = _config_do_ambiente()
+
+TITULOS = ("1. PERFIL", "2. BNCC", "3. ESTRATÉGIAS", "4. CONCLUSÃO")
+FRASES = {
+    "1. PERFIL": (
+        "O estudante apresenta perfil de aprendizagem singular, com potencialidades que devem orientar o planejamento.",
+        "O histórico escolar indica avanços quando as atividades partem de interesses concretos.",
+        "O diagnóstico informado exige atenção às funções executivas e à regulação da atenção.",
+        "A família relata rotina estruturada e participação ativa no acompanhamento escolar.",
+        "O hiperfoco pode ser usado como porta de entrada para novos conteúdos.",
+    ),
+    "2. BNCC": (
+        "A habilidade essencial selecionada será trabalhada com apoio visual e etapas curtas.",
+        "O objetivo é garantir o acesso ao currículo comum, com flexibilização de tempo e de formato.",
+        "A progressão será registrada por meio de evidências observáveis em sala.",
+        "Os objetos de conhecimento serão apresentados com exemplos concretos antes da abstração.",
+    ),
+    "3. ESTRATÉGIAS": (
+        "- Antecipar a rotina do dia com quadro visual.",
+        "- Fragmentar tarefas longas em etapas com verificação ao final de cada uma.",
+        "- Oferecer pausas programadas e ambiente com menos estímulos sensoriais.",
+        "- Usar o hiperfoco como contexto dos problemas propostos.",
+        "- Avaliar por registros orais, portfólio e provas adaptadas.",
+    ),
+    "4. CONCLUSÃO": (
+        "Recomenda-se a implementação imediata das adaptações descritas, com revisão bimestral.",
+        "A articulação entre escola, família e rede de apoio é decisiva para o sucesso do plano.",
+        "Os avanços devem ser documentados para subsidiar as próximas decisões pedagógicas.",
+    ),
+}
+
+def _secao(titulo, rng, palavras):
+    frases, texto, total = FRASES[titulo], [], 0
+    while total < palavras:
+        frase = rng.choice(frases)
+        texto.append(frase); total += len(frase.split())
+    separador = "\n" if titulo == "3. ESTRATÉGIAS" else " "
+    return separador.join(texto)
+
+def relatorio(mensagens, palavras=None):
+    # Determinístico: a semente vem do conteúdo das mensagens
+    conteudo = "\n".join(m.get("content") or "" for m in mensagens)
+    rng = random.Random(hashlib.sha256(conteudo.encode()).digest())
+    palavras = config["palavras"] if palavras is None else palavras
+    # O pedido do relatório inteiro cita todas as seções; o de uma só diz "APENAS A SEÇÃO ..."
+    pedidas = [t for t in TITULOS if f"APENAS A SEÇÃO {t}" in conteudo]
+    if len(pedidas) == 1: return _secao(pedidas[0], rng, palavras)  # geração por seção
+    return "\n\n".join(f"## {t}\n\n{_secao(t, rng, palavras)}" for t in TITULOS)
+
+_sorteio = random.Random(config["semente"])
+_sorteio_lock = threading.Lock()
+
+def _falha():
+    # Sequência de falhas reproduzível para a mesma ordem de pedidos
+    with _sorteio_lock: x = _sorteio.random()
+    if x < config["taxa_429"]: return "429"
+    if x < config["taxa_429"] + config["taxa_timeout"]: return "timeout"
+    return None
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como na API real
+
+    def log_message(self, *args): pass
+
+    def _json(self, status, corpo, cabecalhos=()):
+        dados = json.dumps(corpo, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json"); self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in cabecalhos: self.send_header(nome, valor)
+        self.end_headers(); self.wfile.write(dados)
+
+    def do_POST(self):
+        corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+        try:
+            falha = _falha()
+            if falha == "429":
+                return self._json(429, {"error": {"message": "Rate limit reached (simulado)", "type": "requests", "code": "rate_limit_exceeded"}},
+                                  [("retry-after-ms", str(config["retry_after_ms"]))])
+            if falha == "timeout":
+                time.sleep(config["travamento"]); return self._json(504, {"error": {"message": "timeout (simulado)", "type": "server_error"}})
+            time.sleep(config["latencia"])
+            texto = relatorio(corpo.get("messages", []))
+            uso = {"prompt_tokens": sum(len(m.get("content") or "") for m in corpo.get("messages", [])) // 4,
+                   "completion_tokens": len(texto.split())}
+            uso["total_tokens"] = uso["prompt_tokens"] + uso["completion_tokens"]
+            base = {"id": f"simulado-{hashlib.sha256(texto.encode()).hexdigest()[:12]}", "created": int(time.time()), "model": corpo.get("model", "simulado")}
+            if corpo.get("stream"): self._stream(base, texto, uso, (corpo.get("stream_options") or {}).get("include_usage"))
+            else:
+                self._json(200, {**base, "object": "chat.completion", "usage": uso,
+                                 "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": texto}}]})
+        except (BrokenPipeError, ConnectionResetError): pass  # o cliente desistiu (timeout dele)
+
+    def _stream(self, base, texto, uso, incluir_uso):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream"); self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        def enviar(evento):
+            dados = f"data: {evento}\n\n".encode()
+            self.wfile.write(f"{len(dados):x}\r\n".encode() + dados + b"\r\n"); self.wfile.flush()
+        def pedaco(delta, final=None):
+            return json.dumps({**base, "object": "chat.completion.chunk", "usage": None,
+                               "choices": [{"index": 0, "delta": delta, "finish_reason": final}]}, ensure_ascii=False)
+        intervalo = 1 / config["tokens_s"] if config["tokens_s"] > 0 else 0
+        enviar(pedaco({"role": "assistant", "content": ""}))
+        for token in re.findall(r"\S+\s*|\s+", texto):  # ~1 palavra = 1 token
+            enviar(pedaco({"content": token}))
+            if intervalo: time.sleep(intervalo)
+        enviar(pedaco({}, "stop"))
+        if incluir_uso: enviar(json.dumps({**base, "object": "chat.completion.chunk", "choices": [], "usage": uso}))
+        enviar("[DONE]")
+        self.wfile.write(b"0\r\n\r\n"); self.wfile.flush()
+
+_servidor = None
+_servidor_lock = threading.Lock()
+
+def iniciar_servidor(porta=0, host="127.0.0.1"):
+    # Uma vez por processo; porta 0 = livre. Devolve a base_url para o cliente OpenAI
+    global _servidor
+    with _servidor_lock:
+        if _servidor is None:
+            _servidor = ThreadingHTTPServer((host, porta), _Handler)
+            _servidor.daemon_threads = True
+            threading.Thread(target=_servidor.serve_forever, daemon=True, name="pei-simulado").start()
+        return f"http://{_servidor.server_address[0]}:{_servidor.server_address[1]}/v1"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pei.simulado", description="Servidor local que imita a API de chat da OpenAI.")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--latencia", type=float, default=config["latencia"], help="segundos até o primeiro token")
+    parser.add_argument("--tokens-s", type=float, default=config["tokens_s"], help="tokens por segundo no stream (0 = sem espera)")
+    parser.add_argument("--palavras", type=int, default=config["palavras"], help="palavras por seção")
+    parser.add_argument("--taxa-429", type=float, default=config["taxa_429"])
+    parser.add_argument("--taxa-timeout", type=float, default=config["taxa_timeout"])
+    parser.add_argument("--travamento", type=float, default=config["travamento"], help="segundos parado num timeout simulado")
+    args = parser.parse_args(argv)
+    config.update(latencia=args.latencia, tokens_s=args.tokens_s, palavras=args.palavras,
+                  taxa_429=args.taxa_429, taxa_timeout=args.taxa_timeout, travamento=args.travamento)
+    print(f"Provedor simulado em {iniciar_servidor(args.porta, args.host)}", flush=True)
+    try: threading.Event().wait()
+    except KeyboardInterrupt: return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import copy
+import hashlib
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pei.cliente import mensagem_erro
+from pei.ia import MODELO_IA, POR_SECOES, TEMPERATURA_IA, VERSAO_PROMPT, consultar_gpt_secoes_stream, consultar_gpt_stream
+from pei.metricas import registro
+from pei.respostas import chave_relatorio
+
+# --- FILA DE GERAÇÃO (PROCESSO INTEIRO) ---
+# A geração roda fora do script do Streamlit: trocar de aba ou recarregar não cancela nem repete.
+# MAX_TRABALHADORES limita as gerações simultâneas de todas as sessões juntas. Na geração por seções
+# cada uma abre uma conexão por seção: até MAX_TRABALHADORES × 4 com a OpenAI, limitadas ainda pelo
+# pool de seções (PEI_IA_SECOES_PARALELAS, em pei.ia).
+MAX_TRABALHADORES = int(os.environ.get("PEI_TAREFAS_TRABALHADORES", 4))
+TTL_TAREFA = 3600  # tarefas concluídas ficam disponíveis por 1 h para a sessão buscar o resultado
+
+# Limites por sessão (cliques repetidos) e por chave de API (uma escola não esgota a cota das outras):
+# rajada = gerações seguidas permitidas; por minuto = ritmo de reposição. Acima disso a tarefa espera na fila.
+RAJADA_SESSAO = int(os.environ.get("PEI_GERACOES_RAJADA", 3))
+POR_MINUTO_SESSAO = float(os.environ.get("PEI_GERACOES_POR_MINUTO", 2))
+RAJADA_CHAVE = int(os.environ.get("PEI_CHAVE_RAJADA", 20))
+POR_MINUTO_CHAVE = float(os.environ.get("PEI_CHAVE_POR_MINUTO", 30))
+
+NA_FILA, EXECUTANDO, CONCLUIDA, ERRO = "na_fila", "executando", "concluida", "erro"
+
+class BaldeDeFichas:
+    # Começa cheio; repõe `por_minuto` fichas por minuto até `capacidade`
+    def __init__(self, capacidade, por_minuto):
+        # Sem reposição (ou sem capacidade para uma ficha) a tarefa nunca sairia da fila
+        if capacidade < 1 or por_minuto <= 0:
+            raise ValueError(f"limite de gerações inválido: rajada {capacidade}, {por_minuto} por minuto (use rajada >= 1 e ritmo > 0)")
+        self.capacidade = capacidade
+        self.por_minuto = por_minuto
+        self.disponivel = float(capacidade)
+        self.atualizado = time.monotonic()
+
+    def _repor(self, agora):
+        self.disponivel = min(self.capacidade, self.disponivel + (agora - self.atualizado) * self.por_minuto / 60)
+        self.atualizado = agora
+
+    def espera(self, agora):
+        # Segundos até haver uma ficha (0 = já há)
+        self._repor(agora)
+        if self.disponivel >= 1: return 0.0
+        return (1 - self.disponivel) * 60 / self.por_minuto
+
+    def consumir(self, agora):
+        self._repor(agora)
+        self.disponivel -= 1
+
+    def cheio(self, agora):
+        self._repor(agora)
+        return self.disponivel >= self.capacidade
+
+# Configuração inválida falha ao importar, não no primeiro envio
+for _rajada, _por_minuto in ((RAJADA_SESSAO, POR_MINUTO_SESSAO), (RAJADA_CHAVE, POR_MINUTO_CHAVE)): BaldeDeFichas(_rajada, _por_minuto)
+
+class Tarefa:
+    def __init__(self, api_key, dados, contexto_pdf, regenerar, chave, baldes):
+        self.id = uuid.uuid4().hex
+        self.api_key = api_key
+        self.dados = copy.deepcopy(dados)  # a sessão pode continuar editando enquanto a tarefa roda
+        self.contexto_pdf = contexto_pdf
+        self.regenerar = regenerar
+        self.chave = chave
+        self.baldes = baldes
+        self.assinantes = 1  # sessões acompanhando esta tarefa (pedidos idênticos são agrupados)
+        self.estado = NA_FILA
+        self.partes = []
+        self.erro = None
+        self.criada = time.time()
+        self.iniciada = self.concluida = None
+
+_executor = None
+_tarefas = {}
+_em_voo = {}  # chave da entrada -> tarefa na fila ou executando
+_fila = []    # tarefas NA_FILA, em ordem de chegada
+_baldes = {}
+_executando = 0
+_despertador = None
+_prazo_despertador = None  # instante (monotônico) em que o despertador armado dispara
+_lock = threading.Lock()
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_TRABALHADORES, thread_name_prefix="pei-ia")
+    return _executor
+
+def chave_entrada(dados, contexto_pdf, regenerar):
+    # Mesma entrada => mesmo relatório: pedidos iguais em voo compartilham uma única chamada
+    chave = chave_relatorio(dados, contexto_pdf, MODELO_IA, TEMPERATURA_IA, VERSAO_PROMPT)
+    return f"{chave}:{int(regenerar)}:{int(POR_SECOES)}"
+
+def _balde(nome, capacidade, por_minuto):
+    if nome not in _baldes: _baldes[nome] = BaldeDeFichas(capacidade, por_minuto)
+    return _baldes[nome]
+
+def _executar(tarefa):
+    global _executando
+    tarefa.iniciada = time.time()
+    registro.observar("tarefas.espera", tarefa.iniciada - tarefa.criada)
+    try:
+        gerar = consultar_gpt_secoes_stream if POR_SECOES else consultar_gpt_stream
+        for parte in gerar(tarefa.api_key, tarefa.dados, tarefa.contexto_pdf, tarefa.regenerar):
+            tarefa.partes.append(parte)
+        tarefa.estado = CONCLUIDA
+    except Exception as e:
+        tarefa.erro, tarefa.estado = mensagem_erro(e), ERRO
+    tarefa.concluida = time.time()
+    with _lock:
+        _executando -= 1
+        if _em_voo.get(tarefa.chave) is tarefa: del _em_voo[tarefa.chave]
+        if tarefa.assinantes <= 0: _tarefas.pop(tarefa.id, None)
+        _despachar()
+
+def _despachar():
+    # Chamar com _lock. Inicia, na ordem de chegada, as tarefas com trabalhador livre e ficha nos seus
+    # baldes; uma sessão no limite não segura as outras. O despertador reavalia quando a próxima ficha chega.
+    global _executando, _despertador, _prazo_despertador
+    agora = time.monotonic()
+    proxima = None
+    for tarefa in list(_fila):
+        if _executando >= MAX_TRABALHADORES: break
+        espera = max(b.espera(agora) for b in tarefa.baldes)
+        if espera > 0:
+            proxima = espera if proxima is None else min(proxima, espera)
+            continue
+        for b in tarefa.baldes: b.consumir(agora)
+        _fila.remove(tarefa)
+        tarefa.estado = EXECUTANDO
+        _executando += 1
+        _pool().submit(_executar, tarefa)
+    if proxima is None: return
+    # Uma tarefa de outro balde pode ficar elegível antes do despertador já armado: rearma para ela
+    prazo = agora + proxima + 0.01
+    if _despertador is not None:
+        if _prazo_despertador <= prazo: return
+        _despertador.cancel()
+    _despertador = threading.Timer(prazo - agora, _acordar)
+    _despertador.args = (_despertador,)
+    _despertador.daemon = True
+    _prazo_despertador = prazo
+    _despertador.start()
+
+def _acordar(despertador):
+    global _despertador, _prazo_despertador
+    with _lock:
+        if despertador is not _despertador: return  # cancelado depois de disparar; o novo já está armado
+        _despertador = _prazo_despertador = None
+        _despachar()
+
+def _limpar_antigas(agora):
+    for id_, t in list(_tarefas.items()):
+        if t.concluida and agora - t.concluida > TTL_TAREFA: del _tarefas[id_]
+    # Balde cheio e sem tarefa pendente = igual a um balde novo. Com tarefa na fila ele ainda não foi
+    # consumido (a ficha só sai no despacho): apagá-lo daria uma rajada nova a cada envio.
+    monotonico = time.monotonic()
+    em_uso = {id(b) for t in _tarefas.values() if t.estado in (NA_FILA, EXECUTANDO) for b in t.baldes}
+    for nome, balde in list(_baldes.items()):
+        if id(balde) not in em_uso and balde.cheio(monotonico): del _baldes[nome]
+
+def enviar(api_key, dados, contexto_pdf="", regenerar=False, sessao=None):
+    # Devolve o id da tarefa; guardar em st.session_state e consultar com situacao()
+    chave = chave_entrada(dados, contexto_pdf, regenerar)
+    with _lock:
+        _limpar_antigas(time.time())
+        tarefa = _em_voo.get(chave)
+        if tarefa is not None:
+            # Clique repetido ou outra sessão com a mesma entrada: acompanha a tarefa que já existe
+            tarefa.assinantes += 1
+            registro.contar("tarefas_agrupadas")
+            return tarefa.id
+        baldes = [_balde(f"chave:{hashlib.sha256((api_key or '').encode()).hexdigest()[:16]}", RAJADA_CHAVE, POR_MINUTO_CHAVE)]
+        if sessao: baldes.append(_balde(f"sessao:{sessao}", RAJADA_SESSAO, POR_MINUTO_SESSAO))
+        tarefa = Tarefa(api_key, dados, contexto_pdf, regenerar, chave, baldes)
+        _tarefas[tarefa.id] = tarefa
+        _em_voo[chave] = tarefa
+        _fila.append(tarefa)
+        _despachar()
+    registro.contar("tarefas_enviadas")
+    return tarefa.id
+
+def situacao(tarefa_id):
+    with _lock:
+        tarefa = _tarefas.get(tarefa_id)
+        if tarefa is None: return None
+        na_fila = tarefa.estado == NA_FILA
+        posicao = _fila.index(tarefa) + 1 if na_fila else 0
+        limite = max(b.espera(time.monotonic()) for b in tarefa.baldes) if na_fila else 0.0
+    fim = tarefa.concluida or time.time()
+    return {
+        "estado": tarefa.estado,
+        "posicao": posicao,
+        "limite": round(limite),  # segundos até o limite de uso liberar a tarefa (0 = só espera a vez)
+        "texto": "".join(tarefa.partes),
+        "erro": tarefa.erro,
+        "segundos": round(fim - (tarefa.iniciada or tarefa.criada), 1),
+    }
+
+def descartar(tarefa_id):
+    # Cada sessão retira a sua assinatura; a tarefa sai quando ninguém mais a acompanha e já terminou
+    with _lock:
+        tarefa = _tarefas.get(tarefa_id)
+        if tarefa is None: return
+        tarefa.assinantes -= 1
+        if tarefa.assinantes <= 0 and tarefa.estado in (CONCLUIDA, ERRO): del _tarefas[tarefa_id]
@@ -0,0 +1,78 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import pei.cliente as cliente
+
+# --- CLIENTE OPENAI CONTRA UM SERVIDOR LOCAL ---
+# Cada teste enfileira as respostas do servidor: (status, cabeçalhos, corpo) ou ("trava", segundos).
+MENSAGENS = [{"role": "user", "content": "oi"}]
+RESPOSTA_OK = {"id": "x", "object": "chat.completion", "created": 0, "model": "stub",
+               "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "PEI"}}],
+               "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}}
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args): pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.pedidos.append(time.monotonic())
+        roteiro = self.server.roteiro
+        resposta = roteiro.pop(0) if roteiro else (200, {}, RESPOSTA_OK)
+        if resposta[0] == "trava":
+            time.sleep(resposta[1]); return
+        status, cabecalhos, corpo = resposta
+        dados = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json"); self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in cabecalhos.items(): self.send_header(nome, valor)
+        self.end_headers(); self.wfile.write(dados)
+
+def _erro(mensagem, tipo):
+    return {"error": {"message": mensagem, "type": tipo}}
+
+@pytest.fixture
+def servidor(monkeypatch):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    srv.daemon_threads = True
+    srv.roteiro, srv.pedidos = [], []
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setenv("PEI_OPENAI_BASE_URL", f"http://127.0.0.1:{srv.server_address[1]}/v1")
+    monkeypatch.setattr(cliente, "ESPERA_BASE", 0.01)  # jitter curto entre tentativas sem Retry-After
+    cliente.obter_cliente.cache_clear()
+    yield srv
+    cliente.obter_cliente.cache_clear()
+    srv.shutdown(); srv.server_close()
+
+def test_429_com_retry_after_depois_500_depois_200(servidor):
+    servidor.roteiro = [(429, {"Retry-After": "0.2"}, _erro("rate limit", "requests")),
+                        (500, {}, _erro("falha", "server_error")),
+                        (200, {}, RESPOSTA_OK)]
+    resposta = cliente.criar_resposta("sk-teste", orcamento=10, model="stub", messages=MENSAGENS)
+    assert resposta.choices[0].message.content == "PEI"
+    assert len(servidor.pedidos) == 3
+    assert servidor.pedidos[1] - servidor.pedidos[0] >= 0.2  # respeitou o Retry-After
+
+def test_retry_after_alem_do_orcamento_falha_na_hora(servidor):
+    servidor.roteiro = [(429, {"Retry-After": "30"}, _erro("rate limit", "requests"))]
+    inicio = time.monotonic()
+    with pytest.raises(Exception) as erro:
+        cliente.criar_resposta("sk-teste", orcamento=5, model="stub", messages=MENSAGENS)
+    assert time.monotonic() - inicio < 1
+    assert len(servidor.pedidos) == 1
+    assert cliente.mensagem_erro(erro.value).startswith("⏳ Limite de uso da OpenAI atingido")
+
+def test_servidor_travado_e_cortado_dentro_do_orcamento(servidor):
+    servidor.roteiro = [("trava", 10)] * 5
+    inicio = time.monotonic()
+    with pytest.raises(Exception) as erro:
+        cliente.criar_resposta("sk-teste", orcamento=1.5, model="stub", messages=MENSAGENS)
+    assert time.monotonic() - inicio < 1.5 + 0.5
+    assert cliente.mensagem_erro(erro.value).startswith("⏱️ A OpenAI não respondeu a tempo")
+
+def test_mesmo_cliente_para_a_mesma_chave(servidor):
+    assert cliente.obter_cliente("sk-a") is cliente.obter_cliente("sk-a")
+    assert cliente.obter_cliente("sk-a") is not cliente.obter_cliente("sk-b")